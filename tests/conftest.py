@@ -33,6 +33,15 @@ assert any(app in INSTALLED_APPS for app in ['posts.apps.PostsConfig', 'posts'])
     'Пожалуйста зарегистрируйте приложение в `settings.INSTALLED_APPS`'
 )
 
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def sync_thumbnails(settings):
+    # Фоновые потоки миниатюр конкурируют с тестовой БД за блокировки.
+    settings.THUMBNAIL_WORKERS = 0
+
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
@@ -45,3 +45,24 @@ def few_posts_with_group(mixer, user, group):
 def another_few_posts_with_group_with_follower(mixer, user, another_user, group):
     mixer.blend('posts.Follow', user=user, author=another_user)
     mixer.cycle(20).blend(Post, author=another_user, group=group)
+
+
+@pytest.fixture
+def feed_volume(mixer, user, group):
+    """Seed a feed-sized dataset: 10 followed authors, 300 posts, 50 comments."""
+    from django.contrib.auth.models import User
+    authors = mixer.cycle(10).blend(User)
+    for author in authors:
+        mixer.blend('posts.Follow', user=user, author=author)
+    posts = mixer.cycle(300).blend(
+        Post,
+        author=(authors[i % len(authors)] for i in range(300)),
+        group=(group if i % 2 else None for i in range(300)),
+        image='',
+    )
+    mixer.cycle(50).blend(
+        'posts.Comment',
+        post=posts[0],
+        author=(authors[i % len(authors)] for i in range(50)),
+    )
+    return {'author': authors[0], 'group': group, 'post': posts[0]}
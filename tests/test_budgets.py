@@ -0,0 +1,72 @@
+import time
+import tracemalloc
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+# Бюджеты на холодный запрос (кэш очищен) авторизованного пользователя:
+# два запроса из них — сессия и пользователь.
+VIEW_BUDGETS = {
+    'index': {'queries': 4, 'seconds': 0.5, 'memory_kb': 4096},
+    'group_posts': {'queries': 5, 'seconds': 0.5, 'memory_kb': 4096},
+    'profile': {'queries': 6, 'seconds': 0.5, 'memory_kb': 4096},
+    'post_detail': {'queries': 5, 'seconds': 0.5, 'memory_kb': 4096},
+    'follow_index': {'queries': 5, 'seconds': 0.5, 'memory_kb': 4096},
+}
+
+
+def view_url(name, data):
+    return {
+        'index': '/',
+        'group_posts': f'/group/{data["group"].slug}/',
+        'profile': f'/profile/{data["author"].username}/',
+        'post_detail': f'/posts/{data["post"].id}/',
+        'follow_index': '/follow/',
+    }[name]
+
+
+def measure(client, url):
+    cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+    query_count = len(queries)
+    assert response.status_code == 200, f'Страница `{url}` не открывается'
+
+    cache.clear()
+    tracemalloc.start()
+    try:
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return query_count, elapsed, peak // 1024
+
+
+class TestViewBudgets:
+
+    @pytest.mark.parametrize('name', VIEW_BUDGETS)
+    def test_view_within_budget(self, name, user_client, feed_volume):
+        url = view_url(name, feed_volume)
+        client_warmup = user_client.get(url)
+        assert client_warmup.status_code == 200
+
+        queries, seconds, memory_kb = measure(user_client, url)
+        budget = VIEW_BUDGETS[name]
+        assert queries <= budget['queries'], (
+            f'Страница `{url}` выполняет {queries} запросов к БД, '
+            f'бюджет — {budget["queries"]}'
+        )
+        assert seconds <= budget['seconds'], (
+            f'Страница `{url}` отвечает за {seconds:.3f} с, '
+            f'бюджет — {budget["seconds"]} с'
+        )
+        assert memory_kb <= budget['memory_kb'], (
+            f'Страница `{url}` использует {memory_kb} КБ памяти, '
+            f'бюджет — {budget["memory_kb"]} КБ'
+        )
@@ -0,0 +1,135 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import stats, timeline
+from posts.models import Follow, Group, Post, User
+
+
+class FeedApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        self.posts = [
+            Post.objects.create(author=self.author, group=self.group,
+                                text=f"Пост {i}")
+            for i in range(15)
+        ]
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, json.loads(response.content)
+
+    def test_feeds(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        urls = (
+            reverse("api:posts"),
+            reverse("api:group", args=("group",)),
+            reverse("api:profile", args=("author",)),
+            reverse("api:follow"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                _, data = self.get(url, self.reader_client)
+                self.assertEqual(len(data["results"]), 10)
+                self.assertEqual(data["results"][0], {
+                    "id": self.posts[-1].pk,
+                    "text": "Пост 14",
+                    "pub_date": data["results"][0]["pub_date"],
+                    "author": "author",
+                    "group": "group",
+                    "image": None,
+                })
+
+    def test_cursor_pagination(self):
+        _, first = self.get(reverse("api:posts"), limit=6)
+        response = self.client.get(first["next"])
+        second = json.loads(response.content)
+        ids = [post["id"] for post in first["results"] + second["results"]]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)][:12])
+        back = json.loads(self.client.get(second["previous"]).content)
+        self.assertEqual(back["results"], first["results"])
+
+    def test_sparse_fields(self):
+        with self.assertNumQueries(1):
+            _, data = self.get(reverse("api:posts"), fields="id,text")
+        self.assertEqual(set(data["results"][0]), {"id", "text"})
+        response = self.client.get(reverse("api:posts"), {"fields": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_limit(self):
+        response = self.client.get(reverse("api:posts"), {"limit": "abc"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content),
+                         {"error": "limit должен быть целым числом: abc"})
+
+    def test_unknown_group_and_author(self):
+        for url, error in (
+            (reverse("api:group", args=("nope",)), "Группа не найдена"),
+            (reverse("api:profile", args=("nope",)),
+             "Пользователь не найден"),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertEqual(json.loads(response.content),
+                                 {"error": error})
+
+    def test_conditional_get(self):
+        url = reverse("api:posts")
+        response, _ = self.get(url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Post.objects.create(author=self.author, text="Новый")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_follow_etag_changes_on_follow(self):
+        url = reverse("api:follow")
+        response, data = self.get(url, self.reader_client)
+        self.assertEqual(data["results"], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["results"]), 10)
+
+    def test_follow_etag_changes_with_celebrities(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        url = reverse("api:follow")
+        response, _ = self.get(url, self.reader_client)
+        stats.get_stats(self.author)
+        self.assertTrue(timeline.promote(self.author.pk, force=True))
+        response = self.reader_client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_requires_login(self):
+        response = self.client.get(reverse("api:follow"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream(self):
+        response = self.client.get(reverse("api:posts"),
+                                   {"stream": 1, "fields": "id"})
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([post["id"] for post in data],
+                         [post.pk for post in reversed(self.posts)])
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", views.posts, name="posts"),
+    path("group/<slug:slug>/", views.group_posts, name="group"),
+    path("profile/<str:username>/", views.profile, name="profile"),
+    path("follow/", views.follow, name="follow"),
+]
@@ -0,0 +1,188 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from django.views.decorators.vary import vary_on_cookie
+
+from core.caching import get_last_modified, get_version, make_key
+from posts.lookups import groups, users
+from posts.models import Post
+from posts.paginators import KeysetPaginator
+from posts.timeline import timeline_posts
+
+# Поле ответа -> (колонки для only(), связи для select_related()).
+FIELDS = {
+    "id": (("id",), ()),
+    "text": (("text",), ()),
+    "pub_date": (("pub_date",), ()),
+    "author": (("author", "author__username"), ("author",)),
+    "group": (("group", "group__slug"), ("group",)),
+    "image": (("image",), ()),
+}
+MAX_LIMIT = 100
+STREAM_CHUNK_SIZE = 500
+
+
+def serialize(post, fields):
+    values = {
+        "id": lambda: post.pk,
+        "text": lambda: post.text,
+        "pub_date": lambda: post.pub_date,
+        "author": lambda: post.author.username,
+        "group": lambda: post.group.slug if post.group_id else None,
+        "image": lambda: post.image.url if post.image else None,
+    }
+    return {field: values[field]() for field in fields}
+
+
+def parse_fields(request):
+    value = request.GET.get("fields")
+    if not value:
+        return list(FIELDS)
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = set(fields) - set(FIELDS)
+    if unknown:
+        raise ValueError("Неизвестные поля: %s" % ", ".join(sorted(unknown)))
+    return fields
+
+
+def parse_limit(request):
+    value = request.GET.get("limit")
+    if not value:
+        return settings.DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit должен быть целым числом: %s" % value)
+    if limit < 1:
+        raise ValueError("limit должен быть положительным")
+    return min(limit, MAX_LIMIT)
+
+
+def page_link(request, param, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query.pop("after", None)
+    query.pop("before", None)
+    query[param] = cursor
+    return "%s?%s" % (request.path, query.urlencode())
+
+
+def stream(posts, fields):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield "["
+    for number, post in enumerate(posts.iterator(STREAM_CHUNK_SIZE)):
+        if number:
+            yield ","
+        yield encoder.encode(serialize(post, fields))
+    yield "]"
+
+
+def feed_response(request, posts):
+    try:
+        fields = parse_fields(request)
+        limit = parse_limit(request)
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    columns = {"id", "pub_date"}
+    related = set()
+    for field in fields:
+        columns.update(FIELDS[field][0])
+        related.update(FIELDS[field][1])
+    posts = posts.select_related(*related).only(*columns)
+
+    if request.GET.get("stream"):
+        return StreamingHttpResponse(
+            stream(posts.order_by("-pub_date", "-pk"), fields),
+            content_type="application/json",
+        )
+    page = KeysetPaginator(posts, limit).get_page(
+        after=request.GET.get("after"), before=request.GET.get("before"),
+    )
+    return JsonResponse(
+        {
+            "results": [serialize(post, fields) for post in page],
+            "next": page_link(request, "after", page.next_cursor),
+            "previous": page_link(request, "before", page.previous_cursor),
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def namespaces(request, personal):
+    names = ["posts"]
+    if personal:
+        # Посты «знаменитостей» подмешиваются в ленту при чтении, и их
+        # набор версионируется отдельно.
+        names += ["timeline:%s" % request.user.pk, "celebrities"]
+    return names
+
+
+def api_view(personal=False):
+    # ETag и Last-Modified берутся из версий кэша лент, поэтому ответ 304
+    # отдаётся без запросов к постам.
+    def etag(request, *args, **kwargs):
+        parts = [get_version(name) for name in namespaces(request, personal)]
+        return make_key("api", request.get_full_path(), *parts)
+
+    def last_modified(request, *args, **kwargs):
+        return max(get_last_modified(name)
+                   for name in namespaces(request, personal))
+
+    control = {"max_age": 0, "must_revalidate": True}
+    if personal:
+        control["private"] = True
+
+    def decorator(view):
+        view = condition(etag_func=etag, last_modified_func=last_modified)(
+            view
+        )
+        return require_GET(cache_control(**control)(view))
+    return decorator
+
+
+def not_found(message):
+    return JsonResponse({"error": message}, status=404)
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {"error": "Требуется авторизация"}, status=401
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@api_view()
+def posts(request):
+    return feed_response(request, Post.objects.all())
+
+
+@api_view()
+def group_posts(request, slug):
+    group = groups.get(slug)
+    if group is None:
+        return not_found("Группа не найдена")
+    return feed_response(request, group.posts.all())
+
+
+@api_view()
+def profile(request, username):
+    author = users.get(username)
+    if author is None:
+        return not_found("Пользователь не найден")
+    return feed_response(request, author.posts.all())
+
+
+@login_required
+@vary_on_cookie
+@api_view(personal=True)
+def follow(request):
+    return feed_response(request, timeline_posts(request.user))
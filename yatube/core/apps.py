@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        if getattr(settings, "SQLITE_PRAGMAS", None):
+            from .db import apply_sqlite_pragmas
+            connection_created.connect(apply_sqlite_pragmas)
+        if getattr(settings, "PRECOMPILE_TEMPLATES", False):
+            from .template_backends import precompile_templates
+            precompile_templates()
@@ -0,0 +1,335 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class HitStats:
+    def __init__(self, *names):
+        self._lock = threading.Lock()
+        self._names = names
+        self.reset()
+
+    def incr(self, name, value=1):
+        if value:
+            with self._lock:
+                self._values[name] += value
+
+    def reset(self):
+        with self._lock:
+            self._values = dict.fromkeys(self._names, 0)
+
+    def snapshot(self):
+        with self._lock:
+            values = dict(self._values)
+        lookups = sum(values.values())
+        hits = lookups - values["misses"]
+        values["hit_ratio"] = hits / lookups if lookups else 0.0
+        return values
+
+
+# Счётчики по алиасам кэша. CacheHandler создаёт свой экземпляр бэкенда
+# в каждом потоке, поэтому счётчики на экземпляре видели бы только
+# запросы своего потока.
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _stats_key(alias, conf):
+    return alias, conf.get("BACKEND"), conf.get("LOCATION", "")
+
+
+def shared_stats(backend, location, params, *names):
+    """HitStats алиаса, общие для всех потоков процесса.
+
+    Экземпляру, созданному в обход settings.CACHES, достаются
+    собственные счётчики.
+    """
+    path = "%s.%s" % (type(backend).__module__, type(backend).__name__)
+    for alias, conf in settings.CACHES.items():
+        if (conf.get("BACKEND") == path
+                and conf.get("LOCATION", "") == location
+                and conf.get("OPTIONS", {}) == params.get("OPTIONS", {})):
+            key = _stats_key(alias, conf)
+            with _stats_lock:
+                if key not in _stats:
+                    _stats[key] = HitStats(*names)
+                return _stats[key]
+    return HitStats(*names)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в отдельном файле SQLite, общий для процессов на одном хосте."""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+        self.stats = shared_stats(self, location, params, "hits", "misses")
+        options = params.get("OPTIONS", {})
+        self._cull_interval = options.get("CULL_INTERVAL", 100)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=20,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def _write(self, *queries):
+        # BEGIN IMMEDIATE сразу берёт блокировку записи, поэтому проверка
+        # и запись внутри транзакции атомарны для всех процессов.
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            results = [connection.execute(sql, args).rowcount
+                       for sql, args in queries]
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self._writes += 1
+        if self._writes % self._cull_interval == 0:
+            self._cull()
+        return results
+
+    def _cull(self):
+        connection = self._connection()
+        connection.execute("DELETE FROM cache WHERE expires <= ?",
+                           [time.time()])
+        count = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                [count // self._cull_frequency],
+            )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version)
+        self.validate_key(key)
+        return key
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            "SELECT key, value FROM cache WHERE key IN (%s) "
+            "AND (expires IS NULL OR expires > ?)"
+            % ", ".join("?" * len(keys)),
+            [*keys, time.time()],
+        ).fetchall()
+        self.stats.incr("hits", len(rows))
+        self.stats.incr("misses", len(keys) - len(rows))
+        return {keys[key]: pickle.loads(value) for key, value in rows}
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= time.time():
+            self.delete_many(data, version)
+            return []
+        self._write(*(
+            ("INSERT OR REPLACE INTO cache (key, value, expires) "
+             "VALUES (?, ?, ?)",
+             [self._key(key, version),
+              pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires])
+            for key, value in data.items()
+        ))
+        return []
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        _, inserted = self._write(
+            ("DELETE FROM cache WHERE key = ? AND expires <= ?",
+             [key, time.time()]),
+            ("INSERT OR IGNORE INTO cache (key, value, expires) "
+             "VALUES (?, ?, ?)",
+             [key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires]),
+        )
+        return inserted == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        (updated,) = self._write((
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            [self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()],
+        ))
+        return updated == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT value FROM cache WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)", [key, time.time()]
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                [pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key],
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    def has_key(self, key, version=None):
+        row = self._connection().execute(
+            "SELECT 1 FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            [self._key(key, version), time.time()],
+        ).fetchone()
+        return row is not None
+
+    def delete_many(self, keys, version=None):
+        self._write(*(
+            ("DELETE FROM cache WHERE key = ?", [self._key(key, version)])
+            for key in keys
+        ))
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def clear(self):
+        self._write(("DELETE FROM cache", []))
+
+
+class TwoTierCache(BaseCache):
+    """Быстрый кэш процесса (L1) перед общим кэшем (L2).
+
+    В L1 значения живут не дольше L1_TIMEOUT секунд: изменения, сделанные
+    другими процессами, становятся видны с такой задержкой.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._l1_alias = options.get("L1", "local")
+        self._l2_alias = options.get("L2", "shared")
+        self._l1_timeout = options.get("L1_TIMEOUT", 2)
+        self.stats = shared_stats(self, location, params,
+                                  "l1_hits", "l2_hits", "misses")
+
+    @property
+    def l1(self):
+        return caches[self._l1_alias]
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_set_many(self, data, timeout):
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None:
+            ttl = min(self._l1_timeout, expires - time.time())
+        else:
+            ttl = self._l1_timeout
+        if ttl > 0:
+            self.l1.set_many(data, ttl, version=0)
+        else:
+            self.l1.delete_many(data, version=0)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_key(key, version): key for key in keys}
+        found = self.l1.get_many(keys, version=0)
+        self.stats.incr("l1_hits", len(found))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.l2.get_many(missing, version=0)
+            self.stats.incr("l2_hits", len(shared))
+            self.stats.incr("misses", len(missing) - len(shared))
+            if shared:
+                self.l1.set_many(shared, self._l1_timeout, version=0)
+            found.update(shared)
+        return {keys[key]: value for key, value in found.items()}
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        data = {self.make_key(key, version): value
+                for key, value in data.items()}
+        failed = self.l2.set_many(data, timeout, version=0)
+        self._l1_set_many(data, timeout)
+        return failed
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Атомарность add обеспечивает общий кэш: на нём держатся
+        # межпроцессные блокировки get_or_compute.
+        key = self.make_key(key, version)
+        self.l1.delete(key, version=0)
+        return self.l2.add(key, value, timeout, version=0)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version)
+        self.l1.delete(key, version=0)
+        return self.l2.touch(key, timeout, version=0)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version)
+        self.l1.delete(key, version=0)
+        return self.l2.incr(key, delta, version=0)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version)
+        return (self.l1.has_key(key, version=0)
+                or self.l2.has_key(key, version=0))
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version) for key in keys]
+        self.l1.delete_many(keys, version=0)
+        self.l2.delete_many(keys, version=0)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+
+def cache_stats():
+    for alias in settings.CACHES:
+        # Счётчики заводятся при создании бэкенда.
+        caches[alias]
+    with _stats_lock:
+        stats = {alias: _stats.get(_stats_key(alias, conf))
+                 for alias, conf in settings.CACHES.items()}
+    return {alias: value.snapshot() for alias, value in stats.items()
+            if value is not None}
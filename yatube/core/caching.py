@@ -0,0 +1,82 @@
+import time
+from datetime import datetime, timezone
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+
+def make_key(prefix, *parts):
+    digest = md5(":".join(str(part) for part in parts).encode()).hexdigest()
+    return "%s:%s" % (prefix, digest)
+
+
+def get_version(namespace):
+    key = "version:%s" % namespace
+    version = cache.get(key)
+    if version is None:
+        # Версия от времени не повторяет значения, выданные до вытеснения
+        # ключа из кэша, поэтому устаревшие записи не оживают.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*namespaces):
+    """Версии нескольких пространств одним запросом к кэшу."""
+    keys = ["version:%s" % namespace for namespace in namespaces]
+    found = cache.get_many(keys)
+    return [found[key] if key in found else get_version(namespace)
+            for key, namespace in zip(keys, namespaces)]
+
+
+def bump_version(namespace):
+    key = "version:%s" % namespace
+    cache.set("modified:%s" % namespace, int(time.time()), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+        return cache.get(key)
+
+
+def get_last_modified(namespace):
+    key = "modified:%s" % namespace
+    modified = cache.get(key)
+    if modified is None:
+        # Время изменения неизвестно: считаем, что данные изменились
+        # сейчас, чтобы клиент не получил 304 на устаревшую копию.
+        cache.add(key, int(time.time()), None)
+        modified = cache.get(key)
+    return datetime.fromtimestamp(modified, timezone.utc)
+
+
+def get_or_compute(key, version, compute, timeout=None):
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        metrics.incr("cache_hit")
+        return cached[1]
+    metrics.incr("cache_miss")
+
+    lock_key = "%s:lock" % key
+    if cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, (version, value), timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+    # Пересчётом уже занят другой воркер: отдаём устаревшее значение,
+    # а если его нет — ждём, пока появится свежее.
+    if cached is not None:
+        return cached[1]
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_LOCK_POLL)
+        cached = cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    return compute()
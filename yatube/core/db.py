@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute("PRAGMA %s = %s" % (name, value))
@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import Engine, RequestContext
+from django.test import RequestFactory
+
+from core.template_backends import django_engines
+from posts.models import Post
+
+LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендера posts/index.html с кэширующим '
+            'загрузчиком шаблонов и без него')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def engine(self, loaders):
+        base = django_engines()[0]
+        return Engine(
+            dirs=base.dirs,
+            context_processors=base.context_processors,
+            loaders=loaders,
+            libraries=base.libraries,
+            builtins=base.builtins,
+            debug=False,
+        )
+
+    def render(self, engine, request, page_obj):
+        feed = engine.get_template("posts/includes/index_feed.html").render(
+            RequestContext(request, {"page_obj": page_obj})
+        )
+        return engine.get_template("posts/index.html").render(RequestContext(
+            request, {"page_obj": page_obj, "feed": feed, "index": True}
+        ))
+
+    def measure(self, engine, iterations, request, page_obj):
+        self.render(engine, request, page_obj)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            self.render(engine, request, page_obj)
+        return (time.perf_counter() - started) * 1000 / iterations
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+        page_obj = Paginator(
+            list(Post.objects.select_related("author", "group")
+                 [:settings.DEFAULT_PAGE_SIZE]),
+            settings.DEFAULT_PAGE_SIZE,
+        ).get_page(1)
+        iterations = options['iterations']
+        plain = self.measure(self.engine(LOADERS), iterations,
+                             request, page_obj)
+        cached = self.measure(
+            self.engine([("django.template.loaders.cached.Loader", LOADERS)]),
+            iterations, request, page_obj,
+        )
+        self.stdout.write(f'Без кэша шаблонов: {plain:.2f} мс')
+        self.stdout.write(f'С кэшем шаблонов:  {cached:.2f} мс')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {plain / cached:.1f}x'
+        ))
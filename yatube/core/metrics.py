@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from .cache_backends import cache_stats
+
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = defaultdict(lambda: Histogram())
+_counters = defaultdict(int)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms):
+        index = 0
+        while index < len(BUCKETS_MS) and value_ms > BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value_ms
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.timings = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.active = set()
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings["db"] += time.perf_counter() - started
+            self.counters["db_queries"] += 1
+
+
+def start():
+    _local.current = RequestMetrics()
+    return _local.current
+
+
+def stop():
+    _local.current = None
+
+
+def current():
+    return getattr(_local, "current", None)
+
+
+def incr(name, value=1):
+    metrics = current()
+    if metrics is not None:
+        metrics.counters[name] += value
+
+
+@contextmanager
+def timed(name):
+    metrics = current()
+    # Вложенные замеры одного вида (include внутри шаблона и т. п.)
+    # не суммируются повторно.
+    if metrics is None or name in metrics.active:
+        yield
+        return
+    metrics.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+        metrics.active.discard(name)
+
+
+def observe(view_name, metrics):
+    with _lock:
+        for name, seconds in metrics.timings.items():
+            _histograms[(view_name, name)].observe(seconds * 1000)
+        for name, value in metrics.counters.items():
+            _counters[(view_name, name)] += value
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def render_text():
+    lines = []
+    with _lock:
+        for (view_name, name), histogram in sorted(_histograms.items()):
+            labels = 'view="%s",metric="%s"' % (view_name, name)
+            cumulative = 0
+            for bound, value in zip(BUCKETS_MS + ("+Inf",),
+                                    histogram.buckets):
+                cumulative += value
+                lines.append('yatube_duration_ms_bucket{%s,le="%s"} %d'
+                             % (labels, bound, cumulative))
+            lines.append("yatube_duration_ms_sum{%s} %.3f"
+                         % (labels, histogram.total))
+            lines.append("yatube_duration_ms_count{%s} %d"
+                         % (labels, histogram.count))
+        for (view_name, name), value in sorted(_counters.items()):
+            lines.append('yatube_total{view="%s",counter="%s"} %d'
+                         % (view_name, name, value))
+    for alias, stats in sorted(cache_stats().items()):
+        hit_ratio = stats.pop("hit_ratio")
+        for result, value in sorted(stats.items()):
+            lines.append('yatube_cache_total{cache="%s",result="%s"} %d'
+                         % (alias, result, value))
+        lines.append('yatube_cache_hit_ratio{cache="%s"} %.4f'
+                     % (alias, hit_ratio))
+    return "\n".join(lines) + "\n"
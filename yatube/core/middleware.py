@@ -0,0 +1,49 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(request_metrics.db_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        request_metrics.timings["total"] = time.perf_counter() - started
+
+        match = request.resolver_match
+        view_name = match.view_name if match else "unresolved"
+        metrics.observe(view_name, request_metrics)
+        response["Server-Timing"] = self.server_timing(request_metrics)
+        return response
+
+    def server_timing(self, request_metrics):
+        entries = []
+        for name, seconds in request_metrics.timings.items():
+            entry = "%s;dur=%.1f" % (name, seconds * 1000)
+            if name == "db":
+                entry += ';desc="%d queries"' % (
+                    request_metrics.counters["db_queries"])
+            entries.append(entry)
+        counters = request_metrics.counters
+        if counters["cache_hit"] or counters["cache_miss"]:
+            entries.append('cache;desc="hit=%d miss=%d"'
+                           % (counters["cache_hit"], counters["cache_miss"]))
+        return ", ".join(entries)
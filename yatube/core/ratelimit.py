@@ -0,0 +1,77 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.shortcuts import render
+
+from . import metrics
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
+
+
+def parse_rate(rate):
+    """'20/m' -> (20, 60): объём ведра и время его полного пополнения."""
+    try:
+        count, period = rate.split("/")
+        return int(count), PERIODS[period]
+    except (ValueError, KeyError):
+        raise ImproperlyConfigured("Неверный лимит: %r" % rate)
+
+
+def bucket_keys(request, name):
+    scopes = settings.RATE_LIMITS.get(name, {})
+    if "user" in scopes and request.user.is_authenticated:
+        yield scopes["user"], "ratelimit:%s:user:%s" % (name, request.user.pk)
+    address = request.META.get(settings.RATE_LIMIT_IP_HEADER)
+    if "ip" in scopes and address:
+        address = address.split(",")[0].strip()
+        yield scopes["ip"], "ratelimit:%s:ip:%s" % (name, address)
+
+
+def check(request, name, now=None):
+    """Берёт по жетону из каждого ведра запроса.
+
+    Возвращает 0, если запрос пропущен, иначе — через сколько секунд
+    повторить. Ведро хранится одним числом, моментом его полного
+    наполнения (GCRA): жетон пополняется каждые period / count секунд.
+    Чтение и запись не атомарны, поэтому при гонке воркеров лимит
+    может быть превышен на несколько запросов.
+    """
+    now = now or time.time()
+    updates = {}
+    retry_after = 0
+    for rate, key in bucket_keys(request, name):
+        count, period = parse_rate(rate)
+        full_at = max(cache.get(key, now), now) + period / count
+        if full_at - now > period:
+            retry_after = max(retry_after, full_at - now - period)
+        else:
+            updates[key] = full_at
+    if retry_after:
+        return math.ceil(retry_after)
+    for key, full_at in updates.items():
+        cache.set(key, full_at, math.ceil(full_at - now))
+    return 0
+
+
+def ratelimit(name, methods=("POST",)):
+    """Ограничивает частоту запросов по лимитам RATE_LIMITS[name]."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATE_LIMIT_ENABLED and request.method in methods:
+                retry_after = check(request, name)
+                metrics.incr("ratelimit_checked")
+                if retry_after:
+                    metrics.incr("ratelimit_rejected")
+                    response = render(request, "core/429.html",
+                                      {"retry_after": retry_after},
+                                      status=429)
+                    response["Retry-After"] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
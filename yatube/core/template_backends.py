@@ -0,0 +1,57 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends import django as django_backend
+
+from . import metrics
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with metrics.timed("template"):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def django_engines():
+    return [backend.engine for backend in engines.all()
+            if isinstance(backend, django_backend.DjangoTemplates)]
+
+
+def precompile_templates():
+    # С кэширующим загрузчиком шаблоны разбираются один раз при старте,
+    # а синтаксическая ошибка не даёт процессу запуститься.
+    compiled = 0
+    for engine in django_engines():
+        compiled += precompile(engine)
+    return compiled
+
+
+def precompile(engine):
+    compiled = 0
+    for directory in engine.dirs:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if not filename.endswith((".html", ".txt")):
+                    continue
+                name = os.path.relpath(os.path.join(root, filename),
+                                       directory)
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError as exc:
+                    raise ImproperlyConfigured(
+                        f"Ошибка в шаблоне {name}: {exc}"
+                    ) from exc
+                compiled += 1
+    return compiled
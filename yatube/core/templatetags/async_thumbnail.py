@@ -0,0 +1,58 @@
+import logging
+
+from django import template
+from sorl.thumbnail import default
+
+from core.thumbnail import get_preset, schedule_preset
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+
+class Picture:
+    def __init__(self, preset, ready):
+        self.sizes = preset.sizes
+        # Последний формат пресета — запасной для <img>, остальные
+        # отдаются через <source> тем браузерам, что их понимают.
+        fallback = next(fmt for fmt in reversed(preset.formats)
+                        if fmt in ready)
+        self.sources = [
+            {'type': MIME_TYPES[fmt], 'srcset': self._srcset(ready[fmt])}
+            for fmt in preset.formats if fmt in ready and fmt != fallback
+        ]
+        self.srcset = self._srcset(ready[fallback])
+        self.src = ready[fallback][-1][0].url
+
+    @staticmethod
+    def _srcset(thumbs):
+        return ', '.join('%s %sw' % (thumb.url, width)
+                         for thumb, width in thumbs)
+
+
+@register.simple_tag
+def thumbnail_set(image, preset_name):
+    """Готовые варианты пресета для <picture>; недостающие ставит в очередь."""
+    if not image:
+        return None
+    try:
+        preset = get_preset(preset_name)
+        ready = {}
+        missing = False
+        for variant in preset.variants():
+            thumbnail = default.backend.get_ready_thumbnail(
+                image, variant.geometry, **variant.options)
+            if thumbnail is None:
+                missing = True
+            else:
+                ready.setdefault(variant.format, []).append(
+                    (thumbnail, variant.width))
+        if missing:
+            schedule_preset(image.name, preset_name)
+        return Picture(preset, ready) if ready else None
+    except Exception:
+        logger.exception('Не удалось получить миниатюры %s', image)
+        return None
@@ -0,0 +1,386 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Engine, Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Comment, Post
+
+from . import metrics
+from .cache_backends import SQLiteCache, cache_stats
+from .caching import bump_version, get_or_compute, get_version
+from .db import apply_sqlite_pragmas
+from .template_backends import precompile, precompile_templates
+from .thumbnail import (ThumbnailBackend, generate_preset, get_preset,
+                        thumbnail_version)
+
+User = get_user_model()
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_version_invalidates_value(self):
+        version = get_version("test")
+        self.assertEqual(get_or_compute("key", version, lambda: "old"), "old")
+        self.assertEqual(get_or_compute("key", version, lambda: "new"), "old")
+
+        self.assertNotEqual(bump_version("test"), version)
+        self.assertEqual(
+            get_or_compute("key", get_version("test"), lambda: "new"), "new")
+
+    def test_stale_value_served_while_other_worker_recomputes(self):
+        get_or_compute("key", 1, lambda: "old")
+        cache.add("key:lock", 1)
+
+        def compute():
+            raise AssertionError("Пересчёт должен выполнять один воркер")
+
+        self.assertEqual(get_or_compute("key", 2, compute), "old")
+
+    def test_recompute_after_lock_released(self):
+        get_or_compute("key", 1, lambda: "old")
+        self.assertEqual(get_or_compute("key", 2, lambda: "new"), "new")
+        self.assertIsNone(cache.get("key:lock"))
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_server_timing_header(self):
+        response = self.client.get("/")
+        header = response["Server-Timing"]
+        for name in ("total;dur=", "db;dur=", "template;dur=",
+                     'cache;desc="hit=0 miss=2"'):
+            with self.subTest(name=name):
+                self.assertIn(name, header)
+
+    def test_metrics_endpoint_aggregates_views(self):
+        self.client.get("/")
+        self.client.get("/")
+        admin = User.objects.create_superuser("admin", "a@a.ru", "pass")
+        staff_client = Client()
+        staff_client.force_login(admin)
+
+        response = staff_client.get("/admin/metrics/")
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_duration_ms_count{view="posts:index",metric="total"} 2',
+            text)
+        self.assertIn(
+            'yatube_total{view="posts:index",counter="cache_hit"} 2', text)
+
+    def test_metrics_endpoint_requires_staff(self):
+        response = self.client.get("/admin/metrics/")
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(PERFORMANCE_METRICS_ENABLED=False)
+    def test_disabled_middleware_is_skipped(self):
+        response = Client().get("/")
+        self.assertNotIn("Server-Timing", response)
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0,
+    THUMBNAIL_PRESETS={"test": {
+        "widths": (20, 10), "ratio": 0.5, "options": {"crop": "center"},
+        "formats": ("WEBP", "JPEG"), "sizes": "50vw",
+    }},
+)
+class ThumbnailPresetTests(TestCase):
+    template = Template(
+        '{% load async_thumbnail %}'
+        '{% thumbnail_set image "test" as picture %}'
+        '{% include "core/includes/picture.html" with class="card" %}'
+    )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        buffer = BytesIO()
+        Image.new("RGB", (40, 40), "red").save(buffer, "PNG")
+        name = default_storage.save("posts/preset.png",
+                                    ContentFile(buffer.getvalue()))
+        self.image = ImageFile(name, default_storage)
+
+    def render(self):
+        return self.template.render(Context({"image": self.image}))
+
+    def test_variants_scheduled_in_one_batch(self):
+        with mock.patch(
+            "core.templatetags.async_thumbnail.schedule_preset"
+        ) as job:
+            html = self.render()
+        job.assert_called_once_with(self.image.name, "test")
+        self.assertIn('src="%s"' % self.image.url, html)
+        self.assertNotIn("srcset", html)
+
+    def test_picture_markup_once_ready(self):
+        self.render()
+        html = self.render()
+        self.assertIn("<picture>", html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertRegex(html, r'srcset="[^"]+\.jpg 10w, [^"]+\.jpg 20w"')
+        formats = get_preset("test").formats
+        self.assertEqual("image/webp" in html, "WEBP" in formats)
+        self.assertEqual(formats[-1], "JPEG")
+
+    def test_one_signal_and_version_bump_per_preset(self):
+        version = thumbnail_version(self.image.name)
+        with mock.patch("core.thumbnail.thumbnail_ready.send") as send:
+            self.assertTrue(generate_preset(self.image.name, "test"))
+            self.assertFalse(generate_preset(self.image.name, "test"))
+        send.assert_called_once_with(sender=ThumbnailBackend,
+                                     name=self.image.name, preset="test")
+        self.assertEqual(thumbnail_version(self.image.name), version + 1)
+
+
+class TemplatePrecompileTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        os.makedirs(os.path.join(self.dir, "posts"))
+        self.write("posts/ok.html", "{% if x %}{{ x }}{% endif %}")
+
+    def write(self, name, source):
+        with open(os.path.join(self.dir, name), "w") as template:
+            template.write(source)
+
+    def engine(self):
+        return Engine(dirs=[self.dir], loaders=[(
+            "django.template.loaders.cached.Loader",
+            ["django.template.loaders.filesystem.Loader"],
+        )])
+
+    def test_templates_are_cached(self):
+        engine = self.engine()
+        self.assertEqual(precompile(engine), 1)
+        os.remove(os.path.join(self.dir, "posts/ok.html"))
+        engine.get_template("posts/ok.html")
+
+    def test_syntax_error_fails_fast(self):
+        self.write("posts/broken.html", "{% if x %}")
+        with self.assertRaisesMessage(ImproperlyConfigured,
+                                      "posts/broken.html"):
+            precompile(self.engine())
+
+    def test_project_templates_compile(self):
+        self.assertGreater(precompile_templates(), 0)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("bench_templates", "--iterations", "1", stdout=out)
+        self.assertIn("Ускорение", out.getvalue())
+
+
+class SettingsProfileTests(TestCase):
+    def load_prod(self, **env):
+        with mock.patch.dict(os.environ, env):
+            os.environ.pop("DJANGO_SECRET_KEY", None)
+            os.environ.update(env)
+            sys.modules.pop("yatube.settings.prod", None)
+            return importlib.import_module("yatube.settings.prod")
+
+    def test_prod_profile(self):
+        from yatube.settings import base
+        prod = self.load_prod(DJANGO_SECRET_KEY="prod-secret")
+        self.assertFalse(prod.DEBUG)
+        self.assertEqual(prod.SECRET_KEY, "prod-secret")
+        self.assertEqual(prod.DATABASES["default"]["CONN_MAX_AGE"], 60)
+        self.assertEqual(prod.SQLITE_PRAGMAS["journal_mode"], "WAL")
+        self.assertEqual(prod.TEMPLATES[0]["OPTIONS"]["loaders"][0][0],
+                         "django.template.loaders.cached.Loader")
+        self.assertNotIn("loaders", base.TEMPLATES[0]["OPTIONS"])
+
+    def test_prod_requires_secret_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_prod()
+
+    @override_settings(SQLITE_PRAGMAS={"cache_size": -1234})
+    def test_sqlite_pragmas_applied(self):
+        apply_sqlite_pragmas(None, connection)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA cache_size")
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+
+class SharedCacheTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.path = os.path.join(self.dir, "cache.sqlite3")
+
+    def sqlite_cache(self, **options):
+        return SQLiteCache(self.path, {"OPTIONS": options})
+
+    def test_sqlite_cache_is_shared_between_instances(self):
+        # Два экземпляра над одним файлом ведут себя как два процесса.
+        first, second = self.sqlite_cache(), self.sqlite_cache()
+        first.set("key", {"value": 1})
+        self.assertEqual(second.get("key"), {"value": 1})
+        self.assertTrue(first.add("lock", 1))
+        self.assertFalse(second.add("lock", 1))
+        second.delete("lock")
+        self.assertTrue(first.add("lock", 1))
+        first.set("counter", 1)
+        self.assertEqual(second.incr("counter"), 2)
+        with self.assertRaises(ValueError):
+            second.incr("missing")
+
+    def test_sqlite_cache_expiry_and_cull(self):
+        cache = self.sqlite_cache(MAX_ENTRIES=10, CULL_INTERVAL=1)
+        cache.set("gone", 1, timeout=-1)
+        self.assertIsNone(cache.get("gone"))
+        cache.set("expired", 1, timeout=1)
+        with mock.patch("core.cache_backends.time.time",
+                        return_value=time.time() + 5):
+            self.assertIsNone(cache.get("expired"))
+            self.assertTrue(cache.add("expired", 2))
+        for number in range(30):
+            cache.set(number, number)
+        count = cache._connection().execute(
+            "SELECT COUNT(*) FROM cache").fetchone()[0]
+        self.assertLessEqual(count, 11)
+
+    def test_two_tier_cache(self):
+        shared = {
+            "BACKEND": "core.cache_backends.SQLiteCache",
+            "LOCATION": self.path,
+        }
+        local = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                 "LOCATION": "two-tier-test"}
+        two_tier = {
+            "BACKEND": "core.cache_backends.TwoTierCache",
+            "OPTIONS": {"L1": "local", "L2": "shared", "L1_TIMEOUT": 60},
+        }
+        with self.settings(CACHES={"default": settings.CACHES["default"],
+                                   "two_tier": two_tier, "local": local,
+                                   "shared": shared}):
+            cache = caches["two_tier"]
+            other_process = self.sqlite_cache()
+            cache.set("key", "value")
+            self.assertEqual(cache.get("key"), "value")
+            self.assertEqual(cache.get("missing"), None)
+            caches["local"].clear()
+            self.assertEqual(cache.get("key"), "value")
+            self.assertEqual(cache.stats.snapshot(), {
+                "l1_hits": 1, "l2_hits": 1, "misses": 1,
+                "hit_ratio": 2 / 3,
+            })
+            # Версии ленты меняются через общий кэш.
+            cache.set("version", 1)
+            self.assertEqual(cache.incr("version"), 2)
+            self.assertEqual(cache.get("version"), 2)
+            self.assertTrue(cache.add("lock", 1))
+            self.assertFalse(other_process.add(
+                cache.make_key("lock"), 1, version=0))
+            self.assertIn('yatube_cache_hit_ratio{cache="two_tier"}',
+                          metrics.render_text())
+
+    def test_stats_counted_across_threads(self):
+        shared = {
+            "BACKEND": "core.cache_backends.SQLiteCache",
+            "LOCATION": self.path,
+        }
+        with self.settings(CACHES={"default": settings.CACHES["default"],
+                                   "shared": shared}):
+            caches["shared"].set("key", 1)
+
+            def lookups():
+                # В другом потоке свой экземпляр бэкенда.
+                for _ in range(50):
+                    caches["shared"].get("key")
+                    caches["shared"].get("missing")
+
+            worker = threading.Thread(target=lookups)
+            worker.start()
+            worker.join()
+            stats = cache_stats()["shared"]
+            self.assertEqual((stats["hits"], stats["misses"]), (50, 50))
+
+
+@override_settings(RATE_LIMITS={
+    "add_comment": {"user": "2/m", "ip": "3/m"},
+    "login": {"ip": "2/m"},
+})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username="author")
+        self.post = Post.objects.create(author=self.user, text="Пост")
+        self.client.force_login(self.user)
+        self.url = reverse("posts:add_comment", args=(self.post.pk,))
+
+    def test_user_bucket_returns_429_with_retry_after(self):
+        for _ in range(2):
+            response = self.client.post(self.url, {"text": "Да"})
+            self.assertEqual(response.status_code, 302)
+        response = self.client.post(self.url, {"text": "Да"})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(Comment.objects.count(), 2)
+
+        other = Client()
+        other.force_login(User.objects.create_user(username="reader"))
+        self.assertEqual(other.post(self.url, {"text": "Да"}).status_code,
+                         302)
+        # Ведро адреса общее для обоих пользователей и уже пусто.
+        self.assertEqual(other.post(self.url, {"text": "Да"}).status_code,
+                         429)
+
+    def test_bucket_refills_over_time(self):
+        now = time.time()
+        with mock.patch("core.ratelimit.time.time", return_value=now):
+            self.client.post(self.url, {"text": "Да"})
+            self.client.post(self.url, {"text": "Да"})
+        with mock.patch("core.ratelimit.time.time", return_value=now + 31):
+            response = self.client.post(self.url, {"text": "Да"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_login_limited_by_address_only_for_post(self):
+        client = Client()
+        url = reverse("users:login")
+        for _ in range(3):
+            self.assertEqual(client.get(url).status_code, 200)
+        data = {"username": "author", "password": "wrong"}
+        for _ in range(2):
+            self.assertEqual(client.post(url, data).status_code, 200)
+        self.assertEqual(client.post(url, data).status_code, 429)
+
+    def test_rejections_are_counted(self):
+        for _ in range(3):
+            self.client.post(self.url, {"text": "Да"})
+        text = metrics.render_text()
+        self.assertIn('yatube_total{view="posts:add_comment",'
+                      'counter="ratelimit_checked"} 3', text)
+        self.assertIn('yatube_total{view="posts:add_comment",'
+                      'counter="ratelimit_rejected"} 1', text)
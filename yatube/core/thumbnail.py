@@ -0,0 +1,141 @@
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import metrics
+from .caching import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+thumbnail_ready = Signal(providing_args=["name", "preset"])
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        with metrics.timed("thumbnail"):
+            super()._create_thumbnail(source_image, geometry_string,
+                                      options, thumbnail)
+        metrics.incr("thumbnails_created")
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        # Те же опции, что и в get_thumbnail, но без генерации: только
+        # поиск уже готовой миниатюры в key-value хранилище.
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def generate(name, geometry_string, options):
+    """Создаёт миниатюру, если её ещё нет; True — если создана."""
+    if default.backend.get_ready_thumbnail(name, geometry_string,
+                                           **options):
+        return False
+    default.backend.get_thumbnail(name, geometry_string, **options)
+    return True
+
+
+def _run(key, job, *args):
+    try:
+        job(*args)
+    finally:
+        with _lock:
+            _pending.discard(key)
+        connections.close_all()
+
+
+def _submit(key, job, *args):
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        job(*args)
+        return
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    _executor.submit(_run, key, job, *args)
+
+
+Variant = namedtuple('Variant', 'format width geometry options')
+
+
+class Preset:
+    def __init__(self, name, widths, ratio, options=None,
+                 formats=('JPEG',), sizes='100vw'):
+        self.name = name
+        self.widths = tuple(sorted(widths))
+        self.ratio = ratio
+        self.options = options or {}
+        # WebP пропускается, если Pillow собран без его поддержки.
+        self.formats = tuple(fmt for fmt in formats
+                             if fmt != 'WEBP' or features.check('webp'))
+        self.sizes = sizes
+
+    def variants(self):
+        for fmt in self.formats:
+            for width in self.widths:
+                geometry = '%sx%s' % (width, round(width * self.ratio))
+                yield Variant(fmt, width, geometry,
+                              dict(self.options, format=fmt))
+
+
+def get_preset(name):
+    return Preset(name, **settings.THUMBNAIL_PRESETS[name])
+
+
+def thumbnail_namespace(name):
+    return 'thumbnails:%s' % name
+
+
+def thumbnail_version(name):
+    return get_version(thumbnail_namespace(name))
+
+
+def generate_preset(name, preset_name):
+    # Версия картинки и сигнал — один раз на готовый пресет, а не на
+    # каждый вариант.
+    created = False
+    for variant in get_preset(preset_name).variants():
+        try:
+            created |= generate(name, variant.geometry, variant.options)
+        except Exception:
+            logger.exception('Не удалось создать миниатюру %s', name)
+    if created:
+        bump_version(thumbnail_namespace(name))
+        thumbnail_ready.send(sender=ThumbnailBackend, name=name,
+                             preset=preset_name)
+    return created
+
+
+def schedule_preset(name, preset_name):
+    # Все варианты одной картинки создаются одной задачей воркера.
+    _submit(('preset', name, preset_name), generate_preset, name,
+            preset_name)
@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +19,9 @@ def permission_denied(request, exception):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+@staff_member_required
+def performance_metrics(request):
+    return HttpResponse(metrics.render_text(),
+                        content_type='text/plain; charset=utf-8')
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Group, Post
+from .search import search_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +16,17 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = search_ids(search_term)
+        if not ids:
+            # Индекс ищет только целые слова; части слов и посты, ещё
+            # не попавшие в индекс, находит обычный поиск по LIKE.
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        return queryset.filter(pk__in=ids), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("pk", "title", "slug", "description")
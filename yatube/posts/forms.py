@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .images import process_upload
 from .models import Comment, Post
 
 
@@ -8,6 +10,12 @@ class PostForm(ModelForm):
         model = Post
         fields = ("text", "group", "image")
 
+    def clean_image(self):
+        image = self.cleaned_data.get("image")
+        if isinstance(image, UploadedFile):
+            return process_upload(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
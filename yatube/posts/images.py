@@ -0,0 +1,88 @@
+import hashlib
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps, features
+
+from .models import Post
+
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+def output_format():
+    if settings.IMAGE_FORMAT == "WEBP" and features.check("webp"):
+        return "WEBP"
+    return "JPEG"
+
+
+def content_name(upload, fmt):
+    # Имя считается по исходным байтам и параметрам обработки, поэтому
+    # повторная загрузка того же файла не перекодируется и не дублируется.
+    digest = hashlib.sha256()
+    digest.update(("%s:%s:%s|" % (fmt, settings.IMAGE_MAX_SIDE,
+                                  settings.IMAGE_QUALITY)).encode())
+    upload.seek(0)
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    value = digest.hexdigest()
+    return "%s/%s.%s" % (value[:2], value[2:34], EXTENSIONS[fmt])
+
+
+def reencode(upload, fmt):
+    upload.seek(0)
+    image = Image.open(upload)
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            "Слишком большое изображение: %d×%d точек" % (width, height)
+        )
+    side = settings.IMAGE_MAX_SIDE
+    # draft() декодирует JPEG сразу в уменьшенном масштабе: в память не
+    # попадает полноразмерная картинка.
+    image.draft("RGB", (side, side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((side, side), Image.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    if fmt == "WEBP" and has_alpha:
+        image = image.convert("RGBA")
+    elif has_alpha:
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA"))
+        image = background
+    else:
+        image = image.convert("RGB")
+
+    # Метаданные (EXIF, ICC, комментарии) не переносятся: сохраняются
+    # только пиксели.
+    buffer = BytesIO()
+    options = {"quality": settings.IMAGE_QUALITY}
+    if fmt == "JPEG":
+        options.update(progressive=True, optimize=True)
+    else:
+        options.update(method=4)
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def process_upload(upload):
+    """Проверяет, уменьшает и перекодирует загруженную картинку.
+
+    Возвращает имя уже сохранённого файла с тем же содержимым или
+    ContentFile, который сохранит поле модели.
+    """
+    if upload.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise ValidationError(
+            "Файл больше %s" % filesizeformat(settings.IMAGE_UPLOAD_MAX_BYTES)
+        )
+    fmt = output_format()
+    name = content_name(upload, fmt)
+    stored = posixpath.join(Post._meta.get_field("image").upload_to, name)
+    if default_storage.exists(stored):
+        return stored
+    return ContentFile(reencode(upload, fmt), name=name)
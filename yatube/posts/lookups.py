@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from core.caching import make_key
+
+from .models import Group, User
+
+
+class CachedLookup:
+    """Поиск по уникальному полю с кэшированием облегчённого объекта.
+
+    Кэшируются только перечисленные поля (only()), записи сбрасываются
+    сигналами при изменении и удалении, а TTL ограничивает устаревание,
+    если запись изменили в обход сигналов.
+    """
+
+    def __init__(self, model, field, fields):
+        self.model = model
+        self.field = field
+        self.fields = fields
+
+    def key(self, value):
+        return make_key("lookup", self.model._meta.label_lower, value)
+
+    def get(self, value):
+        key = self.key(value)
+        instance = cache.get(key)
+        if instance is None:
+            instance = (self.model.objects.only(*self.fields)
+                        .filter(**{self.field: value}).first())
+            if instance is None:
+                return None
+            cache.set(key, instance, settings.LOOKUP_CACHE_TIMEOUT)
+        return instance
+
+    def get_or_404(self, value):
+        instance = self.get(value)
+        if instance is None:
+            raise Http404(f"{self.model._meta.object_name} не найден")
+        return instance
+
+    def invalidate(self, *values):
+        cache.delete_many([self.key(value) for value in values])
+
+
+groups = CachedLookup(Group, "slug", ("id", "title", "slug", "description"))
+users = CachedLookup(User, "username",
+                     ("id", "username", "first_name", "last_name"))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.caching import bump_version
+from posts import timeline
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = ('Раздаёт по лентам посты авторов, у которых подписчиков '
+            'стало не больше TIMELINE_FANOUT_LIMIT, и помечает новых '
+            '«знаменитостей»')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Авторов в одной транзакции')
+
+    def handle(self, *args, **options):
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        promoted = AuthorStats.objects.filter(
+            merged_on_read=False, followers_count__gt=limit
+        ).update(merged_on_read=True)
+        if promoted:
+            bump_version('celebrities')
+
+        author_ids = list(AuthorStats.objects.filter(
+            merged_on_read=True, followers_count__lte=limit
+        ).values_list('user_id', flat=True))
+        batch_size = options['batch_size']
+        created = 0
+        for start in range(0, len(author_ids), batch_size):
+            with transaction.atomic():
+                created += timeline.demote(
+                    author_ids[start:start + batch_size]
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Помечено: {promoted}, раздано авторов: {len(author_ids)}, '
+            f'записей в лентах: {created}'
+        ))
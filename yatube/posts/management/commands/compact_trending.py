@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает оценки популярных постов на текущий момент '
+            'и удаляет затухшие строки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Заново посчитать оценки по комментариям')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            kept, deleted = trending.rebuild()
+        else:
+            kept, deleted = trending.compact()
+        self.stdout.write(self.style.SUCCESS(
+            f'Осталось: {kept}, удалено: {deleted}'
+        ))
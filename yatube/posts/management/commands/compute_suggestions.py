@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import compute_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации подписок по графу Follow'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Рекомендаций на пользователя')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users, created = compute_suggestions(options['limit'],
+                                             options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей в графе: {users}, рекомендаций: {created}, '
+            f'{time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,72 @@
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts import views
+from posts.models import Follow, Group, Post, User
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+SLOW_PLAN_RE = re.compile(r'TEMP B-TREE|^SCAN \w+$|Seq Scan')
+
+
+class Command(BaseCommand):
+    help = 'Печатает планы выполнения (EXPLAIN) запросов каждой ленты'
+
+    def targets(self):
+        post = Post.objects.select_related('author', 'group').first()
+        group = Group.objects.first()
+        follow = Follow.objects.select_related('user').first()
+        if post is not None:
+            yield 'index', views.index, {}, None
+            yield 'profile', views.profile, {
+                'username': post.author.username}, None
+            yield 'post_detail', views.post_detail, {
+                'post_id': post.pk}, None
+            words = post.text.split()
+            if words:
+                yield 'search', views.search, {}, {'q': words[0]}
+        if group is not None:
+            yield 'group_posts', views.group_posts, {
+                'slug': group.slug}, None
+        if follow is not None:
+            yield 'follow_index', views.follow_index, {}, follow.user
+
+    def explain(self, sql):
+        if connection.vendor == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        else:
+            prefix = 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        with override_settings(CACHES=NO_CACHE):
+            for name, view, kwargs, extra in self.targets():
+                query = extra if isinstance(extra, dict) else {}
+                request = factory.get('/', query)
+                request.user = (extra if isinstance(extra, User)
+                                else AnonymousUser())
+                with CaptureQueriesContext(connection) as queries:
+                    view(request, **kwargs)
+                self.report(name, queries.captured_queries)
+
+    def report(self, name, captured):
+        selects = [query['sql'] for query in captured
+                   if query['sql'].lstrip().upper().startswith('SELECT')]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{name}: запросов {len(selects)}'
+        ))
+        for sql in selects:
+            self.stdout.write(f'  {sql}')
+            for line in self.explain(sql):
+                style = (self.style.WARNING if SLOW_PLAN_RE.search(line)
+                         else self.style.SUCCESS)
+                self.stdout.write(style(f'    -> {line}'))
@@ -0,0 +1,64 @@
+import csv
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.transfer import EXPORT_FIELDS, KINDS, copy_media, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает пользователей, группы, посты и подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=('ndjson', 'csv'),
+                            default='ndjson')
+        parser.add_argument('--kind', choices=KINDS,
+                            help='Тип записей, для CSV обязателен')
+        parser.add_argument('--output', '-o', default='-')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--media-dir',
+                            help='Куда скопировать картинки постов')
+
+    def handle(self, *args, **options):
+        fmt = options['format']
+        if fmt == 'csv' and not options['kind']:
+            raise CommandError('Для CSV укажите --kind')
+        kinds = [options['kind']] if options['kind'] else KINDS
+        output = options['output']
+        if output == '-':
+            stream = nullcontext(self.stdout)
+        else:
+            stream = open(output, 'w', encoding='utf-8', newline='')
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        with stream as out:
+            for kind in kinds:
+                started = time.monotonic()
+                total = copied = 0
+                rows = export_rows(kind, options['batch_size'])
+                if fmt == 'csv':
+                    writer = csv.DictWriter(out, EXPORT_FIELDS[kind])
+                    writer.writeheader()
+                for row in rows:
+                    if fmt == 'csv':
+                        writer.writerow(row)
+                    else:
+                        # Одним вызовом: OutputWrapper для stdout сам
+                        # дописывает перевод строки, если его нет.
+                        out.write(
+                            encoder.encode({'type': kind, **row}) + '\n'
+                        )
+                    if options['media_dir'] and row.get('image'):
+                        copied += copy_media(
+                            row['image'], target_dir=options['media_dir']
+                        )
+                    total += 1
+                self.report(kind, total, copied, time.monotonic() - started)
+
+    def report(self, kind, total, copied, elapsed):
+        rate = total / elapsed if elapsed else total
+        message = f'{kind}: {total} записей, {rate:.0f}/с'
+        if copied:
+            message += f', файлов: {copied}'
+        self.stderr.write(message)
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.thumbnail import generate_preset
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие варианты миниатюр для всех картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preset', action='append', dest='presets',
+                            help='Пресет из THUMBNAIL_PRESETS, по умолчанию '
+                                 'POST_IMAGE_PRESETS')
+
+    def handle(self, *args, **options):
+        presets = options['presets'] or settings.POST_IMAGE_PRESETS
+        started = time.monotonic()
+        names = (Post.objects.exclude(image='').order_by()
+                 .values_list('image', flat=True).distinct())
+        total = 0
+        for name in names.iterator():
+            for preset in presets:
+                generate_preset(name, preset)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {total}, пресетов: {len(presets)}, '
+            f'за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,78 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core.caching import bump_version
+from posts.transfer import KINDS, ImportConflict, Importer
+
+
+class Command(BaseCommand):
+    help = 'Потоково загружает данные, выгруженные export_posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки или - для stdin')
+        parser.add_argument('--format', choices=('ndjson', 'csv'))
+        parser.add_argument('--kind', choices=KINDS,
+                            help='Тип записей, для CSV обязателен')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--media-dir',
+                            help='Откуда скопировать картинки постов')
+        parser.add_argument('--skip-derived', action='store_true',
+                            help='Не пересчитывать счётчики и индекс')
+
+    def records(self, stream, fmt, kind):
+        if fmt == 'csv':
+            for row in csv.DictReader(stream):
+                yield kind, row
+            return
+        for line in stream:
+            if line.strip():
+                row = json.loads(line)
+                yield row.pop('type'), row
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'ndjson'
+        )
+        if fmt == 'csv' and not options['kind']:
+            raise CommandError('Для CSV укажите --kind')
+        importer = Importer(options['batch_size'], options['media_dir'])
+        started = time.monotonic()
+        if path == '-':
+            stream = sys.stdin
+        else:
+            stream = open(path, encoding='utf-8', newline='')
+        try:
+            for kind, row in self.records(stream, fmt, options['kind']):
+                importer.add(kind, row)
+            counts = importer.finish()
+        except ImportConflict as error:
+            raise CommandError(
+                f'{error}. Загрузка остановлена, загружено: '
+                f'{sum(importer.counts.values())}'
+            )
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Некорректная запись: {error!r}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.monotonic() - started
+        total = sum(counts.values())
+        rate = total / elapsed if elapsed else total
+        for kind in KINDS:
+            if counts[kind]:
+                self.stdout.write(f'{kind}: {counts[kind]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено записей: {total} за {elapsed:.1f} с ({rate:.0f}/с)'
+        ))
+        if not options['skip_derived']:
+            # bulk_create не отправляет сигналы, поэтому производные
+            # данные пересчитываются отдельно.
+            call_command('reconcile_stats', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+        bump_version('posts')
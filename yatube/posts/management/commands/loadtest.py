@@ -0,0 +1,262 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from posts import timeline
+from posts.models import Follow, Group, Post, User
+from posts.stats import reconcile
+
+DEFAULT_MIX = ('index=30,group_posts=15,profile=15,post_detail=20,'
+               'follow_index=10,post_create=5,add_comment=5')
+
+
+def percentile(values, rank):
+    if not values:
+        return 0
+    index = max(0, min(len(values) - 1,
+                       round(rank / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными и нагружает '
+            'yatube.wsgi.application смесью запросов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Подписок на пользователя')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help='Веса представлений: view=вес,...')
+        parser.add_argument('--prefix', default='load',
+                            help='Префикс имён создаваемых данных')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Использовать ранее созданные данные')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Зерно генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.mix = self.parse_mix(options['mix'])
+        self.prefix = options['prefix']
+        if not options['no_seed']:
+            started = time.monotonic()
+            self.seed(options)
+            self.stdout.write(
+                f'Данные созданы за {time.monotonic() - started:.1f} с'
+            )
+        self.load_fixtures()
+        from yatube.wsgi import application
+        self.application = application
+
+        plan = self.random.choices(
+            list(self.mix), weights=list(self.mix.values()),
+            k=options['requests'],
+        )
+        started = time.monotonic()
+        if options['workers'] == 1:
+            results = [self.call(view) for view in plan]
+        else:
+            with ThreadPoolExecutor(options['workers']) as pool:
+                results = list(pool.map(self.call, plan))
+        self.report(results, time.monotonic() - started)
+
+    def parse_mix(self, value):
+        mix = {}
+        for item in value.split(','):
+            view, _, weight = item.partition('=')
+            if not hasattr(self, f'request_{view.strip()}'):
+                raise CommandError(f'Неизвестное представление: {view}')
+            mix[view.strip()] = float(weight or 1)
+        return mix
+
+    def seed(self, options):
+        prefix = self.prefix
+        password = make_password(None)
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [User(username=f'{prefix}-user-{i}', password=password)
+                 for i in range(options['users'])],
+                ignore_conflicts=True,
+            )
+            Group.objects.bulk_create(
+                [Group(slug=f'{prefix}-group-{i}', title=f'Группа {i}',
+                       description='Сгенерирована loadtest')
+                 for i in range(options['groups'])],
+                ignore_conflicts=True,
+            )
+            users = list(User.objects.filter(
+                username__startswith=f'{prefix}-user-'
+            ).values_list('id', flat=True))
+            groups = list(Group.objects.filter(
+                slug__startswith=f'{prefix}-group-'
+            ).values_list('id', flat=True))
+            if not users:
+                raise CommandError('Нужен хотя бы один пользователь')
+            follows = {
+                (user_id, author_id)
+                for user_id in users
+                for author_id in self.random.sample(
+                    users, min(options['follows'], len(users)))
+                if author_id != user_id
+            }
+            Follow.objects.bulk_create(
+                [Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in follows],
+                ignore_conflicts=True,
+            )
+            Post.objects.bulk_create(
+                [Post(author_id=self.random.choice(users),
+                      group_id=self.random.choice(groups + [None]),
+                      text=f'Пост {i} ' + get_random_string(40))
+                 for i in range(options['posts'])],
+                batch_size=1000,
+            )
+            # bulk_create не отправляет сигналы: ленты и счётчики
+            # заполняем сами.
+            timeline.backfill_follows(Follow.objects.filter(
+                user__username__startswith=f'{prefix}-user-'
+            ))
+            reconcile(users)
+
+    def load_fixtures(self):
+        users = list(User.objects.filter(
+            username__startswith=f'{self.prefix}-user-'
+        ).values_list('id', 'username'))
+        if not users:
+            raise CommandError('Нет данных: запустите без --no-seed')
+        self.usernames = [username for _, username in users]
+        self.groups = dict(Group.objects.filter(
+            slug__startswith=f'{self.prefix}-group-'
+        ).values_list('slug', 'id'))
+        self.slugs = list(self.groups)
+        if not self.slugs:
+            self.mix.pop('group_posts', None)
+        self.post_ids = list(Post.objects.filter(
+            author_id__in=[user_id for user_id, _ in users]
+        ).values_list('id', flat=True))
+        self.cookies = {}
+        engine = import_module(settings.SESSION_ENGINE)
+        backend = settings.AUTHENTICATION_BACKENDS[0]
+        for user in User.objects.filter(id__in=[i for i, _ in users]):
+            session = engine.SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = backend
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            csrf = get_random_string(64)
+            self.cookies[user.username] = (csrf, '; '.join((
+                f'{settings.SESSION_COOKIE_NAME}={session.session_key}',
+                f'{settings.CSRF_COOKIE_NAME}={csrf}',
+            )))
+
+    def request_index(self):
+        return 'GET', reverse('posts:index'), None
+
+    def request_group_posts(self):
+        slug = self.random.choice(self.slugs)
+        return 'GET', reverse('posts:group_list', args=(slug,)), None
+
+    def request_profile(self):
+        username = self.random.choice(self.usernames)
+        return 'GET', reverse('posts:profile', args=(username,)), None
+
+    def request_post_detail(self):
+        post_id = self.random.choice(self.post_ids)
+        return 'GET', reverse('posts:post_detail', args=(post_id,)), None
+
+    def request_follow_index(self):
+        return 'GET', reverse('posts:follow_index'), None
+
+    def request_post_create(self):
+        data = {'text': 'Нагрузочный пост ' + get_random_string(20)}
+        if self.slugs and self.random.random() < 0.5:
+            data['group'] = self.groups[self.random.choice(self.slugs)]
+        return 'POST', reverse('posts:create_post'), data
+
+    def request_add_comment(self):
+        post_id = self.random.choice(self.post_ids)
+        return ('POST', reverse('posts:add_comment', args=(post_id,)),
+                {'text': 'Нагрузочный комментарий'})
+
+    def call(self, view):
+        method, path, data = getattr(self, f'request_{view}')()
+        csrf, cookie = self.cookies[self.random.choice(self.usernames)]
+        body = b''
+        if data is not None:
+            data['csrfmiddlewaretoken'] = csrf
+            body = urlencode(data).encode()
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': cookie,
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        status = []
+        started = time.perf_counter()
+        try:
+            response = self.application(
+                environ, lambda code, headers, *args: status.append(code)
+            )
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+        except Exception:
+            status.append('500 Exception')
+        elapsed = (time.perf_counter() - started) * 1000
+        return view, int(status[0].split()[0]) < 400, elapsed
+
+    def report(self, results, elapsed):
+        self.stdout.write(
+            f'{"view":<14}{"req":>7}{"err":>6}{"rps":>9}'
+            f'{"p50,ms":>9}{"p95,ms":>9}{"p99,ms":>9}'
+        )
+        errors = 0
+        for view in self.mix:
+            times = sorted(ms for name, _, ms in results if name == view)
+            failed = sum(1 for name, ok, _ in results
+                         if name == view and not ok)
+            errors += failed
+            self.stdout.write(
+                f'{view:<14}{len(times):>7}{failed:>6}'
+                f'{len(times) / elapsed:>9.1f}'
+                f'{percentile(times, 50):>9.1f}'
+                f'{percentile(times, 95):>9.1f}'
+                f'{percentile(times, 99):>9.1f}'
+            )
+        style = self.style.ERROR if errors else self.style.SUCCESS
+        self.stdout.write(style(
+            f'Всего: {len(results)} запросов за {elapsed:.1f} с, '
+            f'{len(results) / elapsed:.1f} запросов/с, ошибок: {errors}'
+        ))
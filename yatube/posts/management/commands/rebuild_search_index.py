@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import get_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        index = get_index()
+        total = 0
+        with transaction.atomic():
+            index.clear()
+            for post in Post.objects.only('id', 'text').iterator():
+                index.index(post)
+                total += 1
+        if options['verbosity']:
+            self.stdout.write(self.style.SUCCESS(
+                f'{type(index).__name__}: проиндексировано постов: {total}'
+            ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики AuthorStats и исправляет расхождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def batches(self, batch_size):
+        user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for user_id in user_ids.iterator():
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def handle(self, *args, **options):
+        created = updated = 0
+        for batch in self.batches(options['batch_size']):
+            batch_created, batch_updated = reconcile(batch)
+            created += batch_created
+            updated += batch_updated
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {created}, исправлено: {updated}'
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Посты')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчики')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписки')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Комментарии')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        options = {row[0] for row in cursor.fetchall()}
+        if 'ENABLE_FTS5' not in options:
+            return
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts "
+            "USING fts5(body)"
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS posts_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_authorstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='posts.Post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchtoken',
+            index=models.Index(fields=['token', 'post'], name='posts_searc_token_958253_idx'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
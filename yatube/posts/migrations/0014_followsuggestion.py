@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowSuggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('suggested', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Рекомендация подписки',
+                'verbose_name_plural': 'Рекомендации подписок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='followsuggestion',
+            index=models.Index(fields=['user', '-score'], name='posts_follo_user_id_51757e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='followsuggestion',
+            constraint=models.UniqueConstraint(fields=('user', 'suggested'), name='unique follow suggestion'),
+        ),
+    ]
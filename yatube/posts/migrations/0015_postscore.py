@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending_score', serialize=False, to='posts.Post')),
+                ('score', models.FloatField(verbose_name='Оценка')),
+                ('updated', models.DateTimeField(verbose_name='Дата пересчёта')),
+            ],
+            options={
+                'verbose_name': 'Популярность поста',
+                'verbose_name_plural': 'Популярность постов',
+            },
+        ),
+    ]
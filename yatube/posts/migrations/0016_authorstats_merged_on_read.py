@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_celebrities(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(merged_on_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_postscore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='merged_on_read',
+            field=models.BooleanField(default=False, verbose_name='Подмешивать при чтении'),
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
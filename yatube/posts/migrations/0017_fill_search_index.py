@@ -0,0 +1,16 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Индекс заполнял RunPython с tokenize из кода приложения; теперь
+    # это делает обработчик post_migrate (posts.signals.fill_search_index)
+    # через rebuild_search_index, а миграция оставлена пустой, чтобы не
+    # зависеть от будущих изменений стеммера.
+
+    dependencies = [
+        ('posts', '0016_authorstats_merged_on_read'),
+    ]
+
+    operations = []
@@ -43,9 +43,18 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['group', '-pub_date']),
+            models.Index(fields=['author', '-pub_date']),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -67,6 +76,9 @@ class Comment(CreatedModel):
 
     class Meta:
         ordering = ("-created",)
+        indexes = [
+            models.Index(fields=['post', '-created']),
+        ]
 
 
 class Follow(models.Model):
@@ -87,6 +99,122 @@ class Follow(models.Model):
                 fields=['user', 'author'],
                 name="user can not follow himself")
         ]
+        # Уникальное ограничение уже индексирует (user, author);
+        # для раздачи постов подписчикам нужен обратный порядок.
+        indexes = [
+            models.Index(fields=['author', 'user']),
+        ]
 
     def __str__(self):
         return self.user, self.author
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name="unique timeline entry")
+        ]
+        indexes = [
+            models.Index(fields=['user', 'author']),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField('Посты', default=0)
+    followers_count = models.PositiveIntegerField('Подписчики', default=0)
+    following_count = models.PositiveIntegerField('Подписки', default=0)
+    comments_count = models.PositiveIntegerField('Комментарии', default=0)
+    # Посты автора не раздаются по лентам, а подмешиваются при чтении.
+    # Снимает флаг только manage.py backfill_timelines, раздав посты.
+    merged_on_read = models.BooleanField('Подмешивать при чтении',
+                                         default=False)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class SearchToken(models.Model):
+    post = models.ForeignKey(
+        Post,
+        related_name='search_tokens',
+        on_delete=models.CASCADE,
+    )
+    token = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'post']),
+        ]
+
+
+class FollowSuggestion(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='suggestions',
+        on_delete=models.CASCADE,
+    )
+    suggested = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'suggested'],
+                name="unique follow suggestion")
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score']),
+        ]
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+
+
+class PostScore(models.Model):
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        related_name='trending_score',
+        on_delete=models.CASCADE,
+    )
+    score = models.FloatField('Оценка')
+    updated = models.DateTimeField('Дата пересчёта')
+
+    class Meta:
+        verbose_name = 'Популярность поста'
+        verbose_name_plural = 'Популярность постов'
+
+    def __str__(self):
+        return str(self.post_id)
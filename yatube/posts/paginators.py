@@ -0,0 +1,195 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from core.caching import get_or_compute, make_key
+
+# Ключи за пределами 64-битного целого база не примет (OverflowError).
+MAX_PK = 2 ** 63 - 1
+
+
+class KeysetPage(Page):
+    is_keyset = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Keyset page of %s objects>' % len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _no_numbers(self, *args):
+        raise NotImplementedError(
+            "У страниц по курсору нет номеров: используйте "
+            "next_cursor и previous_cursor"
+        )
+
+    start_index = end_index = _no_numbers
+    next_page_number = previous_page_number = _no_numbers
+
+
+class KeysetPaginator(Paginator):
+    def __init__(self, object_list, per_page, date_field="pub_date"):
+        super().__init__(object_list, per_page)
+        self.date_field = date_field
+
+    def encode_cursor(self, obj):
+        value = "%s|%s" % (getattr(obj, self.date_field).isoformat(), obj.pk)
+        return urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            value = urlsafe_b64decode(padded.encode()).decode()
+            date, pk = value.split("|")
+            pk = int(pk)
+            if not -MAX_PK - 1 <= pk <= MAX_PK:
+                raise ValueError("pk вне диапазона")
+            return datetime.fromisoformat(date), pk
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
+
+    def _filter(self, key, lookup):
+        date, pk = key
+        return self.object_list.filter(
+            Q(**{"%s__%s" % (self.date_field, lookup): date})
+            | Q(**{self.date_field: date, "pk__%s" % lookup: pk})
+        )
+
+    def _descending(self, queryset):
+        return queryset.order_by("-%s" % self.date_field, "-pk")
+
+    def _ascending(self, queryset):
+        return queryset.order_by(self.date_field, "pk")
+
+    def first_page(self):
+        rows = list(self._descending(self.object_list)[:self.per_page + 1])
+        return self._forward_page(rows, has_previous=False)
+
+    def _forward_page(self, rows, has_previous):
+        items = rows[:self.per_page]
+        next_cursor = None
+        previous_cursor = None
+        if len(rows) > self.per_page:
+            next_cursor = self.encode_cursor(items[-1])
+        if has_previous and items:
+            previous_cursor = self.encode_cursor(items[0])
+        return KeysetPage(items, self, next_cursor, previous_cursor)
+
+    def page_after(self, key):
+        queryset = self._descending(self._filter(key, "lt"))
+        rows = list(queryset[:self.per_page + 1])
+        return self._forward_page(rows, has_previous=True)
+
+    def page_before(self, key):
+        queryset = self._ascending(self._filter(key, "gt"))
+        rows = list(queryset[:self.per_page + 1])
+        items = rows[:self.per_page]
+        if not items:
+            return self.first_page()
+        items.reverse()
+        previous_cursor = None
+        if len(rows) > self.per_page:
+            previous_cursor = self.encode_cursor(items[0])
+        return KeysetPage(items, self,
+                          self.encode_cursor(items[-1]), previous_cursor)
+
+    def resolve(self, after=None, before=None):
+        """Разобранный курсор: ("after", ключ), ("before", ключ) или
+        ("first",), если курсора нет или он испорчен."""
+        for direction, cursor in (("after", after), ("before", before)):
+            key = self.decode_cursor(cursor) if cursor else None
+            if key is not None:
+                return direction, key
+        return ("first",)
+
+    def get_page(self, after=None, before=None):
+        position = self.resolve(after, before)
+        if position[0] == "after":
+            return self.page_after(position[1])
+        if position[0] == "before":
+            return self.page_before(position[1])
+        return self.first_page()
+
+
+def estimate_count(queryset):
+    # Оценка планировщика PostgreSQL: без прохода по всей таблице.
+    # На других СУБД оценки нет, и считается точное значение.
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class WindowedPaginator(Paginator):
+    """Ссылки только на первую, последнюю и соседние с текущей страницы.
+
+    Число объектов можно передать готовым (count), закэшировать по ключу
+    и версии (count_key) или, для очень больших выборок, взять оценку
+    планировщика.
+    """
+
+    def __init__(self, object_list, per_page, window=2, count=None,
+                 count_key=None, count_version=None):
+        super().__init__(object_list, per_page)
+        self.window = window
+        if count is not None:
+            self.count = count
+        self.count_key = count_key
+        self.count_version = count_version
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "query"):
+            return len(self.object_list)
+        if self.count_key is None:
+            return self.compute_count()
+        return get_or_compute(make_key("count", self.count_key),
+                              self.count_version, self.compute_count,
+                              settings.COUNT_CACHE_TIMEOUT)
+
+    def compute_count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > settings.COUNT_ESTIMATE_MIN:
+            return estimate
+        return self.object_list.count()
+
+    def page_window(self, number):
+        last = self.num_pages
+        pages = {1, last}
+        pages.update(range(max(1, number - self.window),
+                           min(last, number + self.window) + 1))
+        window = []
+        previous = 0
+        for page in sorted(pages):
+            if page - previous > 1:
+                window.append(None)
+            window.append(page)
+            previous = page
+        return window
+
+    def page(self, number):
+        page = super().page(number)
+        page.window = self.page_window(page.number)
+        return page
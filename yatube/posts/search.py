@@ -0,0 +1,207 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+
+from .models import SearchToken
+
+VOWELS = "аеиоуыэюя"
+
+PERFECTIVE_GERUND = (
+    (("в", "вши", "вшись"), True),
+    (("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"), False),
+)
+ADJECTIVE = (
+    (("ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем",
+      "им", "ым", "ом", "его", "ого", "ему", "ому", "их", "ых", "ую", "юю",
+      "ая", "яя", "ою", "ею"), False),
+)
+PARTICIPLE = (
+    (("ем", "нн", "вш", "ющ", "щ"), True),
+    (("ивш", "ывш", "ующ"), False),
+)
+REFLEXIVE = ((("ся", "сь"), False),)
+VERB = (
+    (("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет",
+      "ют", "ны", "ть", "ешь", "нно"), True),
+    (("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй",
+      "ил", "ыл", "им", "ым", "ен", "ило", "ыло", "ено", "ят", "ует", "уют",
+      "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю"), False),
+)
+NOUN = (
+    (("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и",
+      "ией", "ей", "ой", "ий", "й", "иям", "ям", "ием", "ем", "ам", "ом", "о",
+      "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я"),
+     False),
+)
+SUPERLATIVE = ((("ейш", "ейше"), False),)
+DERIVATIONAL = ((("ост", "ость"), False),)
+
+WORD_RE = re.compile(r"\w+")
+CYRILLIC_RE = re.compile(r"[а-я]")
+
+
+def _regions(word):
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, groups):
+    endings = sorted(
+        ((ending, after_a) for group, after_a in groups for ending in group),
+        key=lambda item: len(item[0]),
+        reverse=True,
+    )
+    for ending, after_a in endings:
+        stem = word[:-len(ending)]
+        if not word.endswith(ending) or len(stem) < start:
+            continue
+        if after_a and (len(stem) - 1 < start or stem[-1] not in "ая"):
+            continue
+        return stem
+    return None
+
+
+def stem(word):
+    """Стеммер Портера (Snowball) для русского языка."""
+    word = word.lower().replace("ё", "е")
+    if not CYRILLIC_RE.search(word):
+        return word
+    rv, r2 = _regions(word)
+
+    result = _strip(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        adjective = _strip(word, rv, ADJECTIVE)
+        if adjective is not None:
+            word = _strip(adjective, rv, PARTICIPLE) or adjective
+        else:
+            word = (_strip(word, rv, VERB) or _strip(word, rv, NOUN)
+                    or word)
+    else:
+        word = result
+
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+    if word.endswith("нн") and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif superlative is None and word.endswith("ь") and len(word) > rv:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
+
+
+class TokenIndex:
+    def index(self, post):
+        self.remove(post.pk)
+        SearchToken.objects.bulk_create(
+            SearchToken(post_id=post.pk, token=token[:64], weight=weight)
+            for token, weight in Counter(tokenize(post.text)).items()
+        )
+
+    def remove(self, post_id):
+        SearchToken.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        SearchToken.objects.all().delete()
+
+    def is_empty(self):
+        return not SearchToken.objects.exists()
+
+    def search(self, tokens, limit):
+        tokens = {token[:64] for token in tokens}
+        rows = (SearchToken.objects.filter(token__in=tokens)
+                .values("post_id")
+                .annotate(matched=Count("token", distinct=True),
+                          score=Sum("weight"))
+                .filter(matched=len(tokens))
+                .order_by("-score", "-post_id")[:limit])
+        return [row["post_id"] for row in rows]
+
+
+class FTS5Index:
+    table = "posts_post_fts"
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [post.pk]
+            )
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)",
+                [post.pk, " ".join(tokenize(post.text))],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def is_empty(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT 1 FROM {self.table} LIMIT 1")
+            return cursor.fetchone() is None
+
+    def search(self, tokens, limit):
+        query = " ".join('"%s"' % token for token in set(tokens))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}), rowid DESC LIMIT %s",
+                [query, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+_fts5_tables = {}
+
+
+def fts5_available():
+    name = connection.settings_dict["NAME"]
+    if name not in _fts5_tables:
+        _fts5_tables[name] = (
+            connection.vendor == "sqlite"
+            and FTS5Index.table in connection.introspection.table_names()
+        )
+    return _fts5_tables[name]
+
+
+def get_index():
+    backend = settings.SEARCH_BACKEND
+    if backend == "fts5" or (backend == "auto" and fts5_available()):
+        return FTS5Index()
+    return TokenIndex()
+
+
+def search_ids(query, limit=None):
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    return get_index().search(tokens, limit or settings.SEARCH_MAX_RESULTS)
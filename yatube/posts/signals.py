@@ -0,0 +1,178 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.caching import bump_version
+from core.thumbnail import schedule_preset, thumbnail_ready
+
+from . import search, stats, timeline, trending
+from .lookups import groups, users
+from .models import Comment, Follow, Group, Post, SearchToken, User
+
+LOOKUPS = {Group: groups, User: users}
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feeds(sender, **kwargs):
+    bump_version("posts")
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, update_fields=None, **kwargs):
+    # Вход обновляет только last_login, которого в карточке нет.
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    bump_version("author:%s" % instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    bump_version("group:%s" % instance.pk)
+
+
+@receiver(thumbnail_ready)
+def invalidate_feed_pictures(sender, **kwargs):
+    # Число постов и страницы остаются прежними: сбрасывается только
+    # закэшированная HTML-лента главной.
+    bump_version("thumbnails")
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_timeline(sender, instance, **kwargs):
+    bump_version("timeline:%s" % instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, 'comments_count', 1)
+
+
+@receiver(post_save, sender=Comment)
+def score_comment(sender, instance, created, **kwargs):
+    if created:
+        trending.record(instance.post_id, now=instance.created)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, 'followers_count', 1)
+        stats.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_save, sender=Follow)
+def promote_celebrity(sender, instance, created, **kwargs):
+    # Регистрируется после count_follow: счётчик уже увеличен.
+    if created:
+        timeline.promote(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'followers_count', -1)
+    stats.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnails(sender, instance, **kwargs):
+    if not instance.image:
+        return
+    name = instance.image.name
+    for preset in settings.POST_IMAGE_PRESETS:
+        transaction.on_commit(
+            lambda preset=preset: schedule_preset(name, preset)
+        )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.get_index().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_index().remove(instance.pk)
+
+
+def _lookup_changed(lookup, update_fields):
+    if update_fields is None:
+        return True
+    return bool(set(update_fields) & set(lookup.fields))
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def invalidate_renamed_lookup(sender, instance, update_fields=None, **kwargs):
+    lookup = LOOKUPS[sender]
+    if instance.pk is None or not _lookup_changed(lookup, update_fields):
+        return
+    old = (sender.objects.filter(pk=instance.pk)
+           .values_list(lookup.field, flat=True).first())
+    if old is not None and old != getattr(instance, lookup.field):
+        lookup.invalidate(old)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def invalidate_lookup(sender, instance, update_fields=None, **kwargs):
+    lookup = LOOKUPS[sender]
+    if _lookup_changed(lookup, update_fields):
+        lookup.invalidate(getattr(instance, lookup.field))
+
+
+@receiver(post_migrate)
+def fill_search_index(sender, app_config, verbosity=1,
+                      using=DEFAULT_DB_ALIAS, **kwargs):
+    # Индекс заполняется один раз, когда он пуст, а посты уже есть:
+    # например, после миграции 0011 на существующей базе.
+    if app_config.name != "posts" or using != DEFAULT_DB_ALIAS:
+        return
+    # После отката миграций таблиц поиска может не быть.
+    tables = connection.introspection.table_names()
+    if SearchToken._meta.db_table not in tables:
+        return
+    if search.get_index().is_empty() and Post.objects.exists():
+        call_command("rebuild_search_index", verbosity=verbosity)
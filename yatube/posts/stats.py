@@ -0,0 +1,61 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post
+
+COUNTERS = {
+    'posts_count': (Post, 'author_id'),
+    'followers_count': (Follow, 'author_id'),
+    'following_count': (Follow, 'user_id'),
+    'comments_count': (Comment, 'author_id'),
+}
+
+
+def compute(user_ids):
+    counts = {user_id: dict.fromkeys(COUNTERS, 0) for user_id in user_ids}
+    for field, (model, column) in COUNTERS.items():
+        rows = (model.objects.filter(**{'%s__in' % column: user_ids})
+                .order_by().values(column).annotate(total=Count('pk')))
+        for row in rows:
+            counts[row[column]][field] = row['total']
+    return counts
+
+
+def get_stats(user):
+    stats = getattr(user, 'stats', None)
+    if stats is not None:
+        return stats
+    stats = AuthorStats(user=user, **compute([user.pk])[user.pk])
+    try:
+        with transaction.atomic():
+            stats.save(force_insert=True)
+    except IntegrityError:
+        return AuthorStats.objects.get(user=user)
+    return stats
+
+
+def change(user_id, field, delta):
+    # Строки без статистики не создаются: их посчитает get_stats при
+    # первом чтении, так счётчик не появится у удаляемого пользователя.
+    rows = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{'%s__gte' % field: -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+def reconcile(user_ids):
+    expected = compute(user_ids)
+    existing = AuthorStats.objects.in_bulk(user_ids)
+    created, updated = [], []
+    for user_id, counts in expected.items():
+        stats = existing.get(user_id)
+        if stats is None:
+            created.append(AuthorStats(user_id=user_id, **counts))
+        elif any(getattr(stats, field) != value
+                 for field, value in counts.items()):
+            for field, value in counts.items():
+                setattr(stats, field, value)
+            updated.append(stats)
+    AuthorStats.objects.bulk_create(created, ignore_conflicts=True)
+    AuthorStats.objects.bulk_update(updated, list(COUNTERS))
+    return len(created), len(updated)
@@ -0,0 +1,124 @@
+from array import array
+from collections import defaultdict
+from heapq import nlargest
+from math import sqrt
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, FollowSuggestion
+
+
+def build_csr(size, sources, targets):
+    # Соседи вершины i — targets[offsets[i]:offsets[i + 1]].
+    offsets = array('l', [0]) * (size + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+    position = array('l', offsets)
+    neighbours = array('l', [0]) * len(sources)
+    for source, target in zip(sources, targets):
+        neighbours[position[source]] = target
+        position[source] += 1
+    return offsets, neighbours
+
+
+class FollowGraph:
+    """Граф подписок в плотных массивах (CSR) с номерами вершин 0..n-1."""
+
+    def __init__(self, edges):
+        users, authors = array('q'), array('q')
+        for user_id, author_id in edges:
+            users.append(user_id)
+            authors.append(author_id)
+        self.ids = array('q', sorted(set(users) | set(authors)))
+        index = {user_id: i for i, user_id in enumerate(self.ids)}
+        users = array('l', (index[user_id] for user_id in users))
+        authors = array('l', (index[author_id] for author_id in authors))
+        size = len(self.ids)
+        self.following = build_csr(size, users, authors)
+        self.followers = build_csr(size, authors, users)
+
+    @classmethod
+    def load(cls, chunk_size=10000):
+        edges = Follow.objects.order_by().values_list('user_id', 'author_id')
+        return cls(edges.iterator(chunk_size=chunk_size))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def neighbours(csr, vertex):
+        offsets, neighbours = csr
+        return neighbours[offsets[vertex]:offsets[vertex + 1]]
+
+    def scores(self, vertex):
+        """Друзья друзей и авторы, на которых подписаны ваши подписчики.
+
+        Вклад промежуточной вершины делится на корень из числа её подписок,
+        чтобы подписки «на всех» не забивали рекомендации.
+        """
+        weights = settings.SUGGESTIONS_WEIGHTS
+        scores = defaultdict(float)
+        sources = (
+            (self.following, weights['friends']),
+            (self.followers, weights['cofollow']),
+        )
+        for csr, weight in sources:
+            for middle in self.neighbours(csr, vertex):
+                targets = self.neighbours(self.following, middle)
+                share = weight / sqrt(len(targets)) if targets else 0
+                for target in targets:
+                    scores[target] += share
+        scores.pop(vertex, None)
+        for author in self.neighbours(self.following, vertex):
+            scores.pop(author, None)
+        return scores
+
+    def top(self, vertex, limit):
+        return nlargest(limit, self.scores(vertex).items(),
+                        key=itemgetter(1))
+
+    def suggestions(self, limit):
+        """(user_id, suggested_id, score) для каждого пользователя."""
+        for vertex, user_id in enumerate(self.ids):
+            for target, score in self.top(vertex, limit):
+                yield user_id, self.ids[target], score
+
+
+def compute_suggestions(limit=None, batch_size=1000):
+    limit = limit or settings.SUGGESTIONS_LIMIT
+    graph = FollowGraph.load()
+    # Считаем всё до транзакции, в плотные массивы, а не в объекты
+    # моделей: пока идёт подсчёт, старые рекомендации видны, а блокировка
+    # на запись держится только на время замены.
+    users, suggested, scores = array('q'), array('q'), array('d')
+    for user_id, suggested_id, score in graph.suggestions(limit):
+        users.append(user_id)
+        suggested.append(suggested_id)
+        scores.append(score)
+    with transaction.atomic():
+        FollowSuggestion.objects.all().delete()
+        for start in range(0, len(users), batch_size):
+            end = start + batch_size
+            FollowSuggestion.objects.bulk_create(
+                FollowSuggestion(user_id=user_id, suggested_id=suggested_id,
+                                 score=score)
+                for user_id, suggested_id, score in zip(
+                    users[start:end], suggested[start:end],
+                    scores[start:end])
+            )
+    return len(graph), len(users)
+
+
+def suggestions_for(user, limit=None):
+    # Один запрос: подписки, сделанные после пересчёта, отбрасываются
+    # подзапросом.
+    return list(
+        FollowSuggestion.objects.filter(user=user)
+        .exclude(suggested__following__user=user)
+        .select_related('suggested')
+        .order_by('-score')[:limit or settings.SUGGESTIONS_LIMIT]
+    )
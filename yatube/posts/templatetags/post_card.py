@@ -0,0 +1,21 @@
+from django import template
+
+from core.caching import get_versions
+from core.thumbnail import thumbnail_namespace
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card_version(post):
+    """Версия всего, что карточка берёт не из самого поста.
+
+    Имя автора, группа и готовые миниатюры меняются без изменения
+    Post.updated; их версии читаются одним запросом к кэшу.
+    """
+    namespaces = ['author:%s' % post.author_id]
+    if post.group_id:
+        namespaces.append('group:%s' % post.group_id)
+    if post.image:
+        namespaces.append(thumbnail_namespace(post.image.name))
+    return '-'.join(str(version) for version in get_versions(*namespaces))
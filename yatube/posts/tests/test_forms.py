@@ -12,7 +12,7 @@ from ..models import Comment, Group, Post, User
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostViewsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -122,14 +122,14 @@ class PostViewsTests(TestCase):
             response,
             reverse("posts:post_detail", kwargs={"post_id": self.post.id}),
         )
-        self.assertTrue(
-            Post.objects.filter(
-                text=form_data["text"],
-                author=self.user,
-                group=form_data["group"],
-                image='posts/small2.gif'
-            ).exists()
+        post = Post.objects.get(
+            text=form_data["text"],
+            author=self.user,
+            group=form_data["group"],
         )
+        # Картинка перекодирована и сохранена под именем по содержимому.
+        self.assertRegex(post.image.name,
+                         r"^posts/[0-9a-f]{2}/[0-9a-f]{32}\.(webp|jpg)$")
 
     def test_update_post_unauthenticated_user(self):
         form_data = {
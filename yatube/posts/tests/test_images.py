@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..forms import PostForm
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(size=(3000, 1500), fmt="JPEG", mode="RGB", name="photo.jpg",
+           **save_options):
+    buffer = BytesIO()
+    Image.new(mode, size, "red").save(buffer, fmt, **save_options)
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type="image/%s" % fmt.lower())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0,
+                   IMAGE_FORMAT="JPEG", IMAGE_MAX_SIDE=800)
+class ImagePipelineTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="author")
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        self.client.post(reverse("posts:create_post"),
+                         {"text": "Пост", "image": image})
+        return Post.objects.latest("id")
+
+    def test_downscaled_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera"
+        post = self.create(upload(exif=exif))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (800, 400))
+            self.assertIn("progressive", image.info)
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_transparency_flattened_for_jpeg(self):
+        post = self.create(upload((10, 10), "PNG", "RGBA", "alpha.png"))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.mode, "RGB")
+
+    def test_identical_uploads_share_file(self):
+        first = self.create(upload())
+        second = self.create(upload())
+        self.assertEqual(first.image.name, second.image.name)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=100)
+    def test_size_limit(self):
+        form = PostForm({"text": "Пост"}, {"image": upload()})
+        self.assertFalse(form.is_valid())
+        self.assertIn("image", form.errors)
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_pixel_limit(self):
+        form = PostForm({"text": "Пост"}, {"image": upload((20, 20))})
+        self.assertFalse(form.is_valid())
+        self.assertIn("image", form.errors)
+
+    def test_generate_thumbnails_command(self):
+        self.create(upload())
+        out = StringIO()
+        with self.settings(THUMBNAIL_PRESETS={"post": {
+            "widths": (40, 80), "ratio": 0.5, "formats": ("JPEG",),
+        }}):
+            call_command("generate_thumbnails", stdout=out)
+        self.assertIn("Картинок: 1, пресетов: 1", out.getvalue())
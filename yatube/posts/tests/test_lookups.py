@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.http import Http404
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..lookups import groups, users
+from ..models import Group, User
+
+
+class CachedLookupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        self.user = User.objects.create_user(username="author")
+
+    def test_second_lookup_hits_cache(self):
+        with self.assertNumQueries(1):
+            groups.get("test-slug")
+        with self.assertNumQueries(0):
+            group = groups.get("test-slug")
+        self.assertEqual(group, self.group)
+        self.assertEqual(group.title, "Тестовая группа")
+        with self.assertRaises(Http404):
+            users.get_or_404("nobody")
+
+    def test_views_skip_lookup_query_when_warm(self):
+        client = Client()
+        client.get(reverse("posts:group_list", args=("test-slug",)))
+        client.get(reverse("posts:profile", args=("author",)))
+        with self.assertNumQueries(0):
+            users.get("author")
+            groups.get("test-slug")
+
+    def test_invalidated_on_change(self):
+        groups.get("test-slug")
+        self.group.title = "Новое название"
+        self.group.save()
+        self.assertEqual(groups.get("test-slug").title, "Новое название")
+
+        self.group.slug = "renamed"
+        self.group.save()
+        self.assertIsNone(groups.get("test-slug"))
+        self.assertEqual(groups.get("renamed"), self.group)
+
+        users.get("author")
+        self.user.delete()
+        self.assertIsNone(users.get("author"))
+
+    def test_login_does_not_invalidate(self):
+        users.get("author")
+        self.user.save(update_fields=["last_login"])
+        with self.assertNumQueries(0):
+            users.get("author")
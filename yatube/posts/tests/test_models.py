@@ -1,6 +1,10 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+from ..stats import get_stats
 
 
 class PostModelTest(TestCase):
@@ -43,3 +47,50 @@ class PostModelTest(TestCase):
     def test__models__str__method(self):
         self.assertEqual(str(self.post), self.post.text[:15])
         self.assertEqual(str(self.group), self.group.title)
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.post = Post.objects.create(author=self.author, text="Пост")
+
+    def test_stats_computed_on_first_read(self):
+        stats = get_stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_counters_follow_signals(self):
+        get_stats(self.author)
+        get_stats(self.reader)
+        Post.objects.create(author=self.author, text="Ещё пост")
+        Comment.objects.create(post=self.post, author=self.reader, text="!")
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+
+        author_stats = AuthorStats.objects.get(user=self.author)
+        reader_stats = AuthorStats.objects.get(user=self.reader)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+
+        follow.delete()
+        self.post.delete()
+        author_stats.refresh_from_db()
+        reader_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(reader_stats.comments_count, 0)
+
+    def test_reconcile_stats_fixes_drift(self):
+        get_stats(self.author)
+        AuthorStats.objects.filter(user=self.author).update(posts_count=42)
+        out = StringIO()
+        call_command("reconcile_stats", stdout=out)
+
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).posts_count, 0)
+        self.assertIn("Создано: 1, исправлено: 1", out.getvalue())
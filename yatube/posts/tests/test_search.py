@@ -0,0 +1,110 @@
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, SearchToken
+from ..search import FTS5Index, TokenIndex, get_index, search_ids, stem
+from ..signals import fill_search_index
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_russian_word_forms_share_stem(self):
+        forms = {
+            "кошки": "кошк",
+            "котов": "кот",
+            "коты": "кот",
+            "красивая": "красив",
+            "красивейший": "красив",
+            "читали": "чита",
+            "программирование": "программирован",
+            "Ёлки": "елк",
+        }
+        for word, expected in forms.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_latin_words_are_lowercased(self):
+        self.assertEqual(stem("Django"), "django")
+
+
+class SearchTestMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="IvanIvanov")
+        cls.cats = Post.objects.create(
+            author=cls.user, text="Коты любят коробки, а кошки — коробки")
+        cls.dogs = Post.objects.create(
+            author=cls.user, text="Собаки любят прогулки")
+        cls.box = Post.objects.create(
+            author=cls.user, text="Про коробку и кота")
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_search_matches_all_words_and_ranks(self):
+        self.assertListEqual(search_ids("коробки"), [self.cats.pk,
+                                                     self.box.pk])
+        self.assertListEqual(search_ids("кот прогулка"), [])
+        self.assertListEqual(search_ids("любить собак"), [self.dogs.pk])
+
+    def test_index_follows_post_changes(self):
+        post = Post.objects.create(author=self.user, text="Новый пост")
+        self.assertListEqual(search_ids("новые"), [post.pk])
+        post.text = "Исправленный пост"
+        post.save()
+        self.assertListEqual(search_ids("новые"), [])
+        post.delete()
+        self.assertListEqual(search_ids("исправленный"), [])
+
+    def test_search_view(self):
+        response = self.guest_client.get(reverse("posts:search"),
+                                         {"q": "Коробка"})
+        self.assertListEqual(response.context["page_obj"].object_list,
+                             [self.cats, self.box])
+        self.assertContains(response, "Про коробку и кота")
+        self.assertNotContains(response, "Собаки любят прогулки")
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser("admin", "a@a.ru", "pass")
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse("admin:posts_post_changelist"), {"q": "собаки"})
+        self.assertListEqual(list(response.context["cl"].result_list),
+                             [self.dogs])
+
+    def test_post_migrate_fills_empty_index(self):
+        get_index().clear()
+        self.assertTrue(get_index().is_empty())
+        fill_search_index(sender=None,
+                          app_config=apps.get_app_config("posts"),
+                          verbosity=0)
+        self.assertListEqual(search_ids("собаки"), [self.dogs.pk])
+
+    def test_admin_search_falls_back_to_like(self):
+        get_index().clear()
+        admin = User.objects.create_superuser("admin", "a@a.ru", "pass")
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse("admin:posts_post_changelist"), {"q": "прогул"})
+        self.assertListEqual(list(response.context["cl"].result_list),
+                             [self.dogs])
+
+
+@override_settings(SEARCH_BACKEND="fts5")
+class FTS5SearchTest(SearchTestMixin, TestCase):
+    def test_backend(self):
+        self.assertIsInstance(get_index(), FTS5Index)
+
+
+@override_settings(SEARCH_BACKEND="tokens")
+class TokenSearchTest(SearchTestMixin, TestCase):
+    def test_backend(self):
+        self.assertIsInstance(get_index(), TokenIndex)
+        self.assertTrue(
+            SearchToken.objects.filter(post=self.dogs, token="собак").exists())
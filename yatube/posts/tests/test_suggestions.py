@@ -0,0 +1,72 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion, User
+from ..suggestions import FollowGraph, suggestions_for
+
+
+class FollowSuggestionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {name: User.objects.create_user(username=name)
+                     for name in ("ann", "bob", "cat", "dan", "eve", "max")}
+        for user, author in (("ann", "bob"), ("bob", "cat"), ("bob", "dan"),
+                             ("eve", "ann"), ("eve", "max")):
+            Follow.objects.create(user=cls.users[user],
+                                  author=cls.users[author])
+
+    def names(self, suggestions):
+        return [suggestion.suggested.username for suggestion in suggestions]
+
+    def test_graph_scores_friends_and_cofollowers(self):
+        graph = FollowGraph.load()
+        self.assertEqual(len(graph), 6)
+        ann = list(graph.ids).index(self.users["ann"].pk)
+        top = [graph.ids[vertex] for vertex, _ in graph.top(ann, 3)]
+        expected = [self.users[name].pk for name in ("cat", "dan", "max")]
+        self.assertCountEqual(top[:2], expected[:2])
+        self.assertEqual(top[2], expected[2])
+
+    def test_command_stores_top_suggestions(self):
+        out = StringIO()
+        call_command("compute_suggestions", "--limit", "2",
+                     "--batch-size", "3", stdout=out)
+        self.assertIn("Пользователей в графе: 6", out.getvalue())
+        ann = self.users["ann"]
+        self.assertEqual(
+            FollowSuggestion.objects.filter(user=ann).count(), 2
+        )
+        with self.assertNumQueries(1):
+            suggestions = suggestions_for(ann)
+        self.assertCountEqual(self.names(suggestions), ["cat", "dan"])
+
+        Follow.objects.create(user=ann, author=self.users["cat"])
+        self.assertEqual(self.names(suggestions_for(ann)), ["dan"])
+
+    def test_scores_computed_outside_transaction(self):
+        depth = len(connection.savepoint_ids)
+        top = FollowGraph.top
+
+        def checked_top(graph, vertex, limit):
+            self.assertEqual(len(connection.savepoint_ids), depth)
+            return top(graph, vertex, limit)
+
+        with mock.patch.object(FollowGraph, "top", checked_top):
+            call_command("compute_suggestions", stdout=StringIO())
+        self.assertTrue(FollowSuggestion.objects.exists())
+
+    def test_block_shown_on_own_profile_only(self):
+        call_command("compute_suggestions", stdout=StringIO())
+        client = Client()
+        client.force_login(self.users["ann"])
+        own = client.get(reverse("posts:profile", args=("ann",)))
+        self.assertEqual(self.names(own.context["suggestions"]),
+                         self.names(suggestions_for(self.users["ann"])))
+        self.assertContains(own, reverse("posts:profile", args=("max",)))
+        other = client.get(reverse("posts:profile", args=("bob",)))
+        self.assertEqual(other.context["suggestions"], [])
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry, User)
+from ..search import search_ids
+from ..timeline import timeline_posts
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text="Рыжая кошка"
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=3)
+        )
+        self.post.refresh_from_db()
+        Post.objects.create(author=self.reader, text="Без группы")
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий"
+        )
+        Comment.objects.filter(pk=self.comment.pk).update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        self.comment.refresh_from_db()
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def export(self, *args):
+        path = os.path.join(self.tmp, "dump")
+        call_command("export_posts", "-o", path, *args, stderr=StringIO())
+        return path
+
+    def wipe(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+    def test_ndjson_round_trip(self):
+        path = self.export()
+        self.wipe()
+        out = StringIO()
+        call_command("import_posts", path, "--batch-size", "1", stdout=out)
+        self.assertIn("Загружено записей: 7", out.getvalue())
+        post = Post.objects.select_related("author", "group").get(
+            pk=self.post.pk
+        )
+        self.assertEqual(post.author.username, "author")
+        self.assertEqual(post.group.slug, "group")
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        comment = post.comments.get()
+        self.assertEqual(comment.author.username, "reader")
+        self.assertEqual(comment.created, self.comment.created)
+        reader = User.objects.get(username="reader")
+        self.assertFalse(reader.has_usable_password())
+        self.assertEqual(list(timeline_posts(reader)), [post])
+        self.assertEqual(AuthorStats.objects.get(user=reader).following_count,
+                         1)
+        self.assertEqual(search_ids("кошки"), [post.pk])
+        new_post = Post.objects.create(author=post.author, text="Новый")
+        self.assertGreater(new_post.pk, post.pk)
+
+    def test_ndjson_to_stdout_has_no_blank_lines(self):
+        out = StringIO()
+        call_command("export_posts", stdout=out, stderr=StringIO())
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertNotIn("", lines)
+
+    def test_follows_backfilled_in_one_query_per_batch(self):
+        Follow.objects.create(user=self.author, author=self.reader)
+        path = self.export("--kind", "follow")
+        self.wipe()
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        post = Post.objects.create(author=self.author, text="Пост")
+        Post.objects.create(author=self.reader, text="Ответ")
+        with self.assertNumQueries(6):
+            call_command("import_posts", path, "--skip-derived",
+                         stdout=StringIO())
+        self.assertEqual(list(timeline_posts(self.reader)), [post])
+        self.assertEqual(timeline_posts(self.author).count(), 1)
+
+    def test_import_is_idempotent(self):
+        path = self.export()
+        out = StringIO()
+        call_command("import_posts", path, stdout=out)
+        self.assertIn("Загружено записей: 0", out.getvalue())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_taken_post_id_aborts_import(self):
+        path = self.export()
+        other = User.objects.create_user(username="other")
+        Post.objects.filter(pk=self.post.pk).update(author=other)
+        entries = TimelineEntry.objects.count()
+        with self.assertRaisesMessage(CommandError, "Post с id"):
+            call_command("import_posts", path, stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).author, other)
+        self.assertEqual(TimelineEntry.objects.count(), entries)
+
+    def test_csv_round_trip(self):
+        paths = {}
+        for kind in ("user", "group", "post"):
+            paths[kind] = self.export("--format", "csv", "--kind", kind)
+            os.rename(paths[kind], paths[kind] + kind + ".csv")
+            paths[kind] += kind + ".csv"
+        self.wipe()
+        for kind in ("user", "group", "post"):
+            call_command("import_posts", paths[kind], "--kind", kind,
+                         "--skip-derived", stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.values_list("text", "group__slug")),
+            {("Рыжая кошка", "group"), ("Без группы", None)},
+        )
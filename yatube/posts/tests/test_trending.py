@@ -0,0 +1,80 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Post, PostScore, User
+
+
+@override_settings(TRENDING_HALF_LIFE=3600, TRENDING_MIN_SCORE=0.1)
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="author")
+        cls.quiet, cls.old, cls.hot = (
+            Post.objects.create(author=cls.user, text=f"Пост {i}")
+            for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user, text="Да")
+
+    def test_comments_update_scores_incrementally(self):
+        self.comment(self.hot, 2)
+        self.assertAlmostEqual(
+            PostScore.objects.get(post=self.hot).score, 2, places=2
+        )
+        self.assertFalse(PostScore.objects.filter(post=self.quiet).exists())
+
+    def test_older_activity_decays(self):
+        now = timezone.now()
+        trending.record(self.old.pk, 4, now=now - timedelta(hours=2))
+        trending.record(self.hot.pk, 2, now=now)
+        ranking = trending.ranked(now)
+        self.assertEqual([post_id for post_id, _ in ranking],
+                         [self.hot.pk, self.old.pk])
+        self.assertAlmostEqual(ranking[1][1], 1)
+
+    @override_settings(TRENDING_MAX_ROWS=1)
+    def test_compaction_drops_tail_and_rebases(self):
+        now = timezone.now()
+        trending.record(self.old.pk, 1, now=now - timedelta(hours=1))
+        trending.record(self.quiet.pk, 1, now=now - timedelta(hours=10))
+        trending.record(self.hot.pk, 3, now=now)
+        self.assertEqual(trending.compact(now), (1, 2))
+        row = PostScore.objects.get()
+        self.assertEqual((row.post_id, row.updated), (self.hot.pk, now))
+
+    def test_rebuild_from_comments(self):
+        self.comment(self.old)
+        PostScore.objects.all().delete()
+        out = StringIO()
+        call_command("compact_trending", "--rebuild", stdout=out)
+        self.assertIn("Осталось: 1", out.getvalue())
+        self.assertEqual(trending.trending_ids(), [self.old.pk])
+
+    def test_page_served_from_cached_top_list(self):
+        self.comment(self.hot, 2)
+        self.comment(self.old)
+        url = reverse("posts:trending")
+        response = self.client.get(url)
+        self.assertEqual(list(response.context["page_obj"]),
+                         [self.hot, self.old])
+
+        self.comment(self.quiet, 5)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertNotIn(self.quiet, response.context["page_obj"])
+
+        call_command("compact_trending", stdout=StringIO())
+        response = self.client.get(url)
+        self.assertEqual(response.context["page_obj"][0], self.quiet)
@@ -1,19 +1,30 @@
 import shutil
 import tempfile
+from base64 import urlsafe_b64encode
+from io import StringIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django import forms
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Comment, Follow, Group, Post, User
+from core.thumbnail import generate_preset
+
+from .. import timeline
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry, User)
+from ..paginators import KeysetPaginator, WindowedPaginator
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class PostViewsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -59,6 +70,8 @@ class PostViewsTests(TestCase):
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
         cache.clear()
+        # Миниатюры готовы заранее: их появление сбросило бы кэш ленты.
+        generate_preset(self.post.image.name, "post")
 
     def test_pages_uses_correct_template(self):
         template_page_names = {
@@ -190,19 +203,34 @@ class PostViewsTests(TestCase):
 
     def test_cache_index(self):
         response = self.guest_client.get(reverse('posts:index'))
-        first_post = Post.objects.get(pk=116)
-
-        first_post.text = 'ABCD'
-        first_post.save()
 
+        Post.objects.filter(pk=116).update(text='ABCD')
         second_response = self.guest_client.get(reverse('posts:index'))
-
         self.assertEqual(response.content, second_response.content)
-        cache.clear()
 
+        Post.objects.get(pk=116).save()
         third_response = self.guest_client.get(reverse('posts:index'))
-
         self.assertNotEqual(response.content, third_response.content)
+        self.assertContains(third_response, 'ABCD')
+
+    def test_cache_index_keyed_by_resolved_page(self):
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=116).update(text='ABCD')
+        for query in ('?page=1', '?page=abc', '?utm=x', '?page=0'):
+            with self.subTest(query=query):
+                response = self.guest_client.get(
+                    reverse('posts:index') + query
+                )
+                self.assertNotContains(response, 'ABCD')
+
+    def test_cache_index_shared_between_users(self):
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=116).update(text='ABCD')
+
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'ABCD')
+        self.assertContains(response, reverse('users:logout'))
+        self.assertContains(response, reverse('posts:follow_index'))
 
 
 class FollowTests(TestCase):
@@ -340,3 +368,280 @@ class PaginatorViewsTest(TestCase):
             + "?page=2"
         )
         self.assertEqual(len(response.context["page_obj"]), 8)
+
+    @override_settings(PAGINATION_MODES={"index": "keyset",
+                                         "group_posts": "keyset"})
+    def test_keyset_pages_follow_cursors(self):
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": self.group.slug}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).context["page_obj"]
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+
+                second = self.authorized_client.get(
+                    url, {"after": first.next_cursor}
+                ).context["page_obj"]
+                self.assertEqual(len(second), 8)
+                self.assertFalse(second.has_next())
+                self.assertFalse(set(first) & set(second))
+
+                back = self.authorized_client.get(
+                    url, {"before": second.previous_cursor}
+                ).context["page_obj"]
+                self.assertListEqual(list(back), list(first))
+
+    @override_settings(PAGINATION_MODES={"index": "keyset"})
+    def test_keyset_invalid_cursor_returns_first_page(self):
+        response = self.authorized_client.get(
+            reverse("posts:index"), {"after": "not-a-cursor"}
+        )
+        page_obj = response.context["page_obj"]
+        self.assertEqual(len(page_obj), 10)
+        self.assertEqual(page_obj[0], Post.objects.first())
+
+    @override_settings(PAGINATION_MODES={"index": "keyset"})
+    def test_keyset_cursor_with_huge_pk_returns_first_page(self):
+        cursor = urlsafe_b64encode(
+            ("%s|%s" % (Post.objects.first().pub_date.isoformat(), "9" * 30))
+            .encode()
+        ).decode()
+        response = self.authorized_client.get(
+            reverse("posts:index"), {"after": cursor}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["page_obj"][0],
+                         Post.objects.first())
+
+    def test_keyset_page_has_no_numbers(self):
+        page = KeysetPaginator(Post.objects.all(), 10).get_page()
+        for name in ("start_index", "end_index", "next_page_number",
+                     "previous_page_number"):
+            with self.subTest(method=name):
+                with self.assertRaises(NotImplementedError):
+                    getattr(page, name)()
+
+    def test_page_window_skips_distant_pages(self):
+        paginator = WindowedPaginator(list(range(100)), 5, window=1)
+        self.assertEqual(paginator.page(1).window, [1, 2, None, 20])
+        self.assertEqual(paginator.page(10).window,
+                         [1, None, 9, 10, 11, None, 20])
+        self.assertEqual(paginator.page(19).window, [1, None, 18, 19, 20])
+
+    def test_count_is_cached_until_version_changes(self):
+        url = reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        self.authorized_client.get(url)
+        # update() не отправляет сигналов: версия та же, число из кэша.
+        Post.objects.filter(pk=Post.objects.first().pk).update(group=None)
+        response = self.authorized_client.get(url + "?page=2")
+        self.assertEqual(response.context["page_obj"].paginator.count, 18)
+        self.assertContains(response, 'href="?page=1"')
+
+        Post.objects.filter(group=self.group).first().delete()
+        response = self.authorized_client.get(url + "?page=2")
+        self.assertEqual(response.context["page_obj"].paginator.count, 16)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(author=cls.author, text='old')
+
+    def setUp(self):
+        cache.clear()
+        self.client_reader = Client()
+        self.client_reader.force_login(self.reader)
+
+    def feed(self):
+        response = self.client_reader.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+
+        new_post = Post.objects.create(author=self.author, text='new')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post).exists())
+        self.assertListEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client_reader.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'author'}))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertListEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='new')
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post).exists())
+        self.assertListEqual(self.feed(), [new_post, self.old_post])
+        self.assertTrue(AuthorStats.objects.get(user=self.author)
+                        .merged_on_read)
+
+    def test_feed_query_does_not_aggregate_followers(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.feed()
+        self.assertFalse([query for query in queries
+                          if "GROUP BY" in query["sql"]])
+
+    def test_demoted_author_is_backfilled_by_command(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with override_settings(TIMELINE_FANOUT_LIMIT=0):
+            new_post = Post.objects.create(author=self.author, text='new')
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=self.author)
+        TimelineEntry.objects.all().delete()
+
+        with self.assertNumQueries(1):
+            timeline.prune(other.pk, self.author.pk)
+        self.assertListEqual(self.feed(), [new_post, self.old_post])
+
+        call_command('backfill_timelines', stdout=StringIO())
+        self.assertFalse(AuthorStats.objects.get(user=self.author)
+                         .merged_on_read)
+        self.assertEqual(TimelineEntry.objects.filter(
+            user=self.reader).count(), 2)
+        self.assertListEqual(self.feed(), [new_post, self.old_post])
+
+
+class PostDetailQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        cls.user = User.objects.create_user(username="IvanIvanov")
+        cls.post = Post.objects.create(
+            author=cls.user, text="Тестовый пост", group=cls.group
+        )
+        for i in range(25):
+            commentator = User.objects.create_user(username=f"user{i}")
+            Comment.objects.create(
+                post=cls.post, author=commentator, text=f"Комментарий {i}"
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse(
+            "posts:post_detail", kwargs={"post_id": self.post.id}
+        )
+        self.guest_client.get(self.url)
+
+    def test_post_detail_query_count_is_constant(self):
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(self.url)
+        self.assertContains(response, "user24")
+
+    def test_comments_are_paginated(self):
+        response = self.guest_client.get(self.url)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), settings.COMMENTS_PAGE_SIZE)
+
+        response = self.guest_client.get(self.url, {"comments_page": 2})
+        self.assertEqual(len(response.context["comments"]), 5)
+        self.assertContains(response, "?comments_page=1")
+
+
+class ExplainFeedsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username="author")
+        reader = User.objects.create_user(username="reader")
+        group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Post.objects.create(author=author, text="Тестовый пост", group=group)
+        Follow.objects.create(user=reader, author=author)
+
+    def test_plans_printed_for_every_feed(self):
+        out = StringIO()
+        call_command("explain_feeds", stdout=out)
+        output = out.getvalue()
+        for name in ("index", "group_posts", "profile", "post_detail",
+                     "follow_index", "search"):
+            with self.subTest(name=name):
+                self.assertIn(f"{name}: запросов", output)
+        self.assertIn("posts_post_group_i", output)
+        self.assertIn("posts_post_author_", output)
+
+
+class LoadtestCommandTest(TestCase):
+    def setUp(self):
+        # Как и тестовый клиент, не даём обработчику закрыть соединение
+        # с базой внутри транзакции теста.
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    def test_all_views_served_without_errors(self):
+        out = StringIO()
+        call_command("loadtest", "--users", "5", "--posts", "20",
+                     "--follows", "2", "--requests", "70", "--workers", "1",
+                     "--seed", "1", stdout=out)
+        output = out.getvalue()
+        for name in ("index", "group_posts", "profile", "post_detail",
+                     "follow_index", "post_create", "add_comment"):
+            with self.subTest(name=name):
+                self.assertRegex(output, rf"\n{name} +\d+ +0 ")
+        self.assertIn("ошибок: 0", output)
+        self.assertGreater(Post.objects.count(), 20)
+        self.assertTrue(Comment.objects.exists())
+
+
+class PostCardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text="Старый текст"
+        )
+        self.url = reverse("posts:group_list", args=("test-slug",))
+
+    def test_card_reused_until_post_is_edited(self):
+        self.assertContains(self.client.get(self.url), "Старый текст")
+        Post.objects.filter(pk=self.post.pk).update(text="Без сигналов")
+        response = self.client.get(
+            reverse("posts:profile", args=("author",))
+        )
+        self.assertContains(response, "Старый текст")
+
+        self.post.text = "Новый текст"
+        self.post.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "Новый текст")
+        self.assertNotContains(response, "Старый текст")
+
+    def test_card_follows_author_and_group_changes(self):
+        self.client.get(self.url)
+        self.client.get(reverse("posts:profile", args=("author",)))
+        self.author.first_name, self.author.last_name = "Лев", "Толстой"
+        self.author.save()
+        self.assertContains(self.client.get(self.url), "Лев Толстой")
+
+        self.group.slug = "new-slug"
+        self.group.save()
+        response = self.client.get(reverse("posts:profile", args=("author",)))
+        self.assertContains(
+            response, reverse("posts:group_list", args=("new-slug",))
+        )
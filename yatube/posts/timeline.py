@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from core.caching import bump_version, get_or_compute, get_version, make_key
+
+from . import stats
+from .models import AuthorStats, Follow, Post, TimelineEntry, User
+
+
+def celebrity_ids():
+    # Авторы, чьи посты подмешиваются при чтении. Набор общий для всех
+    # пользователей и сбрасывается только при смене флага у автора.
+    return get_or_compute(
+        make_key("celebrities"), get_version("celebrities"),
+        lambda: frozenset(AuthorStats.objects.filter(merged_on_read=True)
+                          .values_list('user_id', flat=True)),
+    )
+
+
+def promote(author_id, force=False):
+    rows = AuthorStats.objects.filter(user_id=author_id,
+                                      merged_on_read=False)
+    if not force:
+        rows = rows.filter(followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+    if rows.update(merged_on_read=True):
+        bump_version("celebrities")
+        return True
+    return False
+
+
+def timeline_posts(user):
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return Post.objects.filter(timeline_entries__user=user)
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    followed = (Follow.objects.filter(user=user, author_id__in=celebrities)
+                .values('author_id'))
+    return Post.objects.filter(
+        Q(id__in=entries) | Q(author_id__in=followed)
+    )
+
+
+def fan_out(post):
+    fan_out_many([post])
+
+
+def fan_out_many(posts):
+    # Раздача сразу пачки постов: один запрос подписчиков на всю пачку.
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    celebrities = celebrity_ids()
+    posts = [post for post in posts if post.author_id not in celebrities]
+    if not posts:
+        return
+    followers = {}
+    rows = Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).values_list('author_id', 'user_id')
+    for author_id, user_id in rows.iterator():
+        followers.setdefault(author_id, []).append(user_id)
+    for author_id, user_ids in followers.items():
+        if len(user_ids) > limit:
+            # Счётчик подписчиков мог отстать: доверяем живому числу.
+            stats.get_stats(User(pk=author_id))
+            promote(author_id, force=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, author_id=post.author_id)
+         for post in posts
+         if len(followers.get(post.author_id, ())) <= limit
+         for user_id in followers.get(post.author_id, ())],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    posts = (Post.objects.filter(author_id=author_id)
+             .values_list('id', flat=True)
+             [:settings.TIMELINE_BACKFILL_SIZE])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, author_id=author_id)
+         for post_id in posts],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_follows(follows):
+    """Дописывает в ленты последние посты авторов для всех подписок follows.
+
+    Один INSERT ... SELECT вместо выборки и вставки на каждую подписку.
+    """
+    connection = connections[follows.db]
+    follows_sql, params = (follows.order_by().values('user_id', 'author_id')
+                           .query.sql_with_params())
+    quote = connection.ops.quote_name
+    sql = (
+        "{insert} {timeline} ({user}, {post}, {author}) "
+        "SELECT f.user_id, p.id, p.author_id FROM ({follows}) f "
+        "INNER JOIN {posts} p ON p.author_id = f.author_id "
+        "WHERE p.id IN (SELECT p2.id FROM {posts} p2 "
+        "WHERE p2.author_id = f.author_id "
+        "ORDER BY p2.pub_date DESC, p2.id DESC LIMIT %s) {suffix}"
+    ).format(
+        insert=connection.ops.insert_statement(ignore_conflicts=True),
+        timeline=quote(TimelineEntry._meta.db_table),
+        user=quote('user_id'),
+        post=quote('post_id'),
+        author=quote('author_id'),
+        follows=follows_sql,
+        posts=quote(Post._meta.db_table),
+        suffix=connection.ops.ignore_conflicts_suffix_sql(
+            ignore_conflicts=True),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*params, settings.TIMELINE_BACKFILL_SIZE))
+        return cursor.rowcount
+
+
+def prune(user_id, author_id):
+    # Если автор после отписки перестал быть «знаменитостью», его посты
+    # по-прежнему подмешиваются при чтении, пока их не раздаст
+    # manage.py backfill_timelines.
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def demote(author_ids):
+    """Раздаёт посты авторов, которые больше не «знаменитости»."""
+    if not author_ids:
+        return 0
+    created = backfill_follows(Follow.objects.filter(author_id__in=author_ids))
+    AuthorStats.objects.filter(user_id__in=author_ids).update(
+        merged_on_read=False
+    )
+    bump_version("celebrities")
+    return created
@@ -0,0 +1,236 @@
+import os
+import shutil
+from collections import Counter
+from datetime import datetime
+
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import timeline
+from .models import Comment, Follow, Group, Post, User
+
+KINDS = ('user', 'group', 'post', 'comment', 'follow')
+
+EXPORT_FIELDS = {
+    'user': {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'email': 'email',
+        'date_joined': 'date_joined',
+    },
+    'group': {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    },
+    'post': {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'image': 'image',
+    },
+    'comment': {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    'follow': {
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+}
+
+QUERYSETS = {
+    'user': User.objects.all,
+    'group': Group.objects.all,
+    'post': Post.objects.all,
+    'comment': Comment.objects.all,
+    'follow': Follow.objects.all,
+}
+
+
+def export_rows(kind, chunk_size):
+    fields = EXPORT_FIELDS[kind]
+    rows = (QUERYSETS[kind]().order_by('pk')
+            .values_list(*fields.values()).iterator(chunk_size=chunk_size))
+    for values in rows:
+        # isoformat, а не DjangoJSONEncoder: тот отбрасывает микросекунды.
+        yield {name: value.isoformat() if isinstance(value, datetime)
+               else value for name, value in zip(fields, values)}
+
+
+def copy_media(name, source_dir=None, target_dir=None):
+    # Файл копируется потоком, целиком в память он не читается.
+    if not name:
+        return False
+    if target_dir is not None:
+        target = os.path.join(target_dir, name)
+        if os.path.exists(target) or not default_storage.exists(name):
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with default_storage.open(name) as src, open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        return True
+    source = os.path.join(source_dir, name)
+    if default_storage.exists(name) or not os.path.exists(source):
+        return False
+    with open(source, 'rb') as src:
+        default_storage.save(name, src)
+    return True
+
+
+class ImportConflict(ValueError):
+    """Запись выгрузки занимает id, уже принадлежащий другой записи."""
+
+
+def create_with_dates(model, instances, field):
+    # bulk_create перезаписывает auto_now_add текущим временем, поэтому
+    # даты из выгрузки возвращаются одним UPDATE на пачку.
+    dates = [getattr(instance, field) for instance in instances]
+    model.objects.bulk_create(instances)
+    for instance, date in zip(instances, dates):
+        setattr(instance, field, date)
+    model.objects.bulk_update(instances, [field])
+
+
+class Importer:
+    def __init__(self, batch_size=1000, media_dir=None):
+        self.batch_size = batch_size
+        self.media_dir = media_dir
+        self.counts = Counter()
+        self.kind = None
+        self.batch = []
+
+    def add(self, kind, row):
+        if kind not in KINDS:
+            raise ValueError(f'Неизвестный тип записи: {kind}')
+        if kind != self.kind or len(self.batch) >= self.batch_size:
+            self.flush()
+            self.kind = kind
+        self.batch.append(row)
+
+    def flush(self):
+        if not self.batch:
+            return
+        with transaction.atomic():
+            created = getattr(self, f'import_{self.kind}s')(self.batch)
+        self.counts[self.kind] += created
+        self.batch = []
+
+    def finish(self):
+        self.flush()
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [Post, Comment]):
+                cursor.execute(sql)
+        return self.counts
+
+    def user_ids(self, usernames):
+        return dict(User.objects.filter(username__in=set(usernames))
+                    .values_list('username', 'id'))
+
+    def new_rows(self, model, instances, *fields):
+        """Отбрасывает записи, уже загруженные из этой же выгрузки.
+
+        Если id занят другой записью, загрузка прерывается: иначе
+        комментарии и ленты достались бы чужому посту.
+        """
+        existing = {
+            pk: values for pk, *values in model.objects.filter(
+                pk__in=[instance.pk for instance in instances]
+            ).values_list('pk', *fields)
+        }
+        for instance in instances:
+            values = existing.get(instance.pk)
+            if values is not None and values != [
+                    getattr(instance, field) for field in fields]:
+                raise ImportConflict(
+                    f'{model.__name__} с id {instance.pk} '
+                    f'уже есть в базе и не совпадает с выгрузкой'
+                )
+        return [instance for instance in instances
+                if instance.pk not in existing]
+
+    def import_users(self, rows):
+        existing = set(User.objects.filter(
+            username__in={row['username'] for row in rows}
+        ).values_list('username', flat=True))
+        users = [User(username=row['username'],
+                      first_name=row.get('first_name') or '',
+                      last_name=row.get('last_name') or '',
+                      email=row.get('email') or '',
+                      password='!',
+                      date_joined=parse_datetime(row['date_joined']))
+                 for row in rows if row['username'] not in existing]
+        User.objects.bulk_create(users, ignore_conflicts=True)
+        return len(users)
+
+    def import_groups(self, rows):
+        existing = set(Group.objects.filter(
+            slug__in={row['slug'] for row in rows}
+        ).values_list('slug', flat=True))
+        groups = [Group(slug=row['slug'], title=row['title'],
+                        description=row.get('description') or '')
+                  for row in rows if row['slug'] not in existing]
+        Group.objects.bulk_create(groups, ignore_conflicts=True)
+        return len(groups)
+
+    def import_posts(self, rows):
+        users = self.user_ids(row['author'] for row in rows)
+        groups = dict(Group.objects.filter(
+            slug__in={row['group'] for row in rows if row.get('group')}
+        ).values_list('slug', 'id'))
+        posts = self.new_rows(Post, [
+            Post(id=row['id'],
+                 author_id=users[row['author']],
+                 group_id=groups.get(row.get('group')),
+                 text=row['text'],
+                 pub_date=parse_datetime(row['pub_date']),
+                 image=row.get('image') or '')
+            for row in rows
+        ], 'author_id', 'pub_date')
+        if self.media_dir:
+            for post in posts:
+                copy_media(post.image.name, source_dir=self.media_dir)
+        create_with_dates(Post, posts, 'pub_date')
+        timeline.fan_out_many(posts)
+        return len(posts)
+
+    def import_comments(self, rows):
+        users = self.user_ids(row['author'] for row in rows)
+        comments = self.new_rows(Comment, [
+            Comment(id=row['id'], post_id=row['post'],
+                    author_id=users[row['author']], text=row['text'],
+                    created=parse_datetime(row['created']))
+            for row in rows
+        ], 'post_id', 'author_id', 'created')
+        create_with_dates(Comment, comments, 'created')
+        return len(comments)
+
+    def import_follows(self, rows):
+        users = self.user_ids(
+            name for row in rows for name in (row['user'], row['author'])
+        )
+        pairs = {(users[row['user']], users[row['author']])
+                 for row in rows if row['user'] != row['author']}
+        user_ids = {user_id for user_id, _ in pairs}
+        author_ids = {author_id for _, author_id in pairs}
+        # Пересечение пользователей и авторов пачки: лишние пары
+        # отбрасываются, а в лентах уже есть.
+        batch_follows = Follow.objects.filter(user_id__in=user_ids,
+                                              author_id__in=author_ids)
+        follows = [Follow(user_id=user_id, author_id=author_id)
+                   for user_id, author_id in pairs - set(
+                       batch_follows.values_list('user_id', 'author_id'))]
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        if follows:
+            # Одна вставка в ленты на всю пачку.
+            timeline.backfill_follows(batch_follows)
+        return len(follows)
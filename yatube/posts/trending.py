@@ -0,0 +1,102 @@
+from datetime import timedelta
+from heapq import nlargest
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.caching import bump_version, get_or_compute, get_version, make_key
+
+from .models import Comment, PostScore
+
+
+def decay(score, updated, now):
+    age = max((now - updated).total_seconds(), 0)
+    return score * 0.5 ** (age / settings.TRENDING_HALF_LIFE)
+
+
+def record(post_id, weight=1.0, now=None):
+    # Оценка хранится на момент updated и затухает при каждом чтении,
+    # поэтому обновлять приходится только строку комментируемого поста.
+    now = now or timezone.now()
+    with transaction.atomic():
+        row = (PostScore.objects.select_for_update()
+               .filter(post_id=post_id).first())
+        if row is None:
+            try:
+                with transaction.atomic():
+                    PostScore.objects.create(post_id=post_id, score=weight,
+                                             updated=now)
+                return
+            except IntegrityError:
+                row = PostScore.objects.select_for_update().get(
+                    post_id=post_id
+                )
+        row.score = decay(row.score, row.updated, now) + weight
+        row.updated = max(row.updated, now)
+        row.save(update_fields=['score', 'updated'])
+
+
+def ranked(now=None, limit=None):
+    now = now or timezone.now()
+    scores = (
+        (decay(score, updated, now), post_id)
+        for post_id, score, updated
+        in PostScore.objects.values_list('post_id', 'score', 'updated')
+    )
+    return [(post_id, score) for score, post_id in nlargest(
+        limit or settings.TRENDING_SIZE, scores
+    ) if score >= settings.TRENDING_MIN_SCORE]
+
+
+def trending_ids():
+    return get_or_compute(
+        make_key('trending'), get_version('trending'),
+        lambda: [post_id for post_id, _ in ranked()],
+        settings.TRENDING_CACHE_TIMEOUT,
+    )
+
+
+def compact(now=None):
+    """Пересчитывает оценки на текущий момент и удаляет лишние строки.
+
+    Остаются не больше TRENDING_MAX_ROWS постов с оценкой не ниже
+    TRENDING_MIN_SCORE.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(PostScore.objects.select_for_update())
+        for row in rows:
+            row.score = decay(row.score, row.updated, now)
+            row.updated = now
+        rows.sort(key=lambda row: row.score, reverse=True)
+        kept = [row for row in rows[:settings.TRENDING_MAX_ROWS]
+                if row.score >= settings.TRENDING_MIN_SCORE]
+        stale = [row.pk for row in rows[len(kept):]]
+        for start in range(0, len(stale), 500):
+            PostScore.objects.filter(pk__in=stale[start:start + 500]).delete()
+        PostScore.objects.bulk_update(kept, ['score', 'updated'],
+                                      batch_size=500)
+    bump_version('trending')
+    return len(kept), len(stale)
+
+
+def rebuild(now=None):
+    # Для данных, загруженных мимо сигналов: учитываются комментарии
+    # за последние TRENDING_REBUILD_HALF_LIVES периодов полураспада.
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_HALF_LIFE
+                            * settings.TRENDING_REBUILD_HALF_LIVES)
+    scores = {}
+    comments = (Comment.objects.filter(created__gte=since).order_by()
+                .values_list('post_id', 'created').iterator())
+    for post_id, created in comments:
+        scores[post_id] = scores.get(post_id, 0) + decay(1.0, created, now)
+    with transaction.atomic():
+        PostScore.objects.all().delete()
+        PostScore.objects.bulk_create(
+            [PostScore(post_id=post_id, score=score, updated=now)
+             for post_id, score in scores.items()],
+            batch_size=500,
+        )
+    return compact(now)
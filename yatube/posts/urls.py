@@ -15,6 +15,8 @@ urlpatterns = [
          views.add_comment,
          name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending, name='trending'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
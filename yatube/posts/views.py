@@ -1,32 +1,77 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
-
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
 
+from core.caching import get_or_compute, get_version, make_key
+from core.ratelimit import ratelimit
 
-def get_page_obj(queryset, request):
-    paginator = Paginator(queryset, settings.DEFAULT_PAGE_SIZE)
+from .forms import CommentForm, PostForm
+from .lookups import groups, users
+from .models import Follow, Post
+from .paginators import KeysetPaginator, WindowedPaginator
+from .search import search_ids
+from .stats import get_stats
+from .suggestions import suggestions_for
+from .timeline import timeline_posts
+from .trending import trending_ids
+
+
+def get_page_obj(queryset, request, name=None, count=None,
+                 count_key=None, count_version=None):
+    if settings.PAGINATION_MODES.get(name) == "keyset":
+        paginator = KeysetPaginator(queryset, settings.DEFAULT_PAGE_SIZE)
+        return paginator.get_page(after=request.GET.get("after"),
+                                  before=request.GET.get("before"))
+    paginator = WindowedPaginator(
+        queryset, settings.DEFAULT_PAGE_SIZE, settings.PAGINATION_WINDOW,
+        count=count, count_key=count_key,
+        count_version=count_version or get_version("posts"),
+    )
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
 def index(request):
-    page_obj = get_page_obj(Post.objects.select_related("author"), request)
+    posts = Post.objects.select_related("author", "group")
+    # Ключ кэша — разобранная страница, а не строка запроса: лишние
+    # параметры и варианты записи номера не плодят записи в кэше.
+    if settings.PAGINATION_MODES.get("index") == "keyset":
+        page_obj = SimpleLazyObject(
+            lambda: get_page_obj(posts, request, "index")
+        )
+        position = ("keyset",) + KeysetPaginator(
+            posts, settings.DEFAULT_PAGE_SIZE
+        ).resolve(request.GET.get("after"), request.GET.get("before"))
+    else:
+        # Номер страницы проверяется по закэшированному числу постов,
+        # сами посты выбираются, только если страницы нет в кэше.
+        page_obj = get_page_obj(posts, request, "index", count_key="index")
+        position = ("offset", page_obj.number)
+    feed = get_or_compute(
+        make_key("index_page", *position),
+        (get_version("posts"), get_version("thumbnails")),
+        lambda: render_to_string("posts/includes/index_feed.html",
+                                 {"page_obj": page_obj}, request),
+        settings.INDEX_CACHE_TIMEOUT,
+    )
     context = {
         "page_obj": page_obj,
+        "feed": feed,
+        "index": True,
     }
     return render(request, "posts/index.html", context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    page_obj = get_page_obj(group.posts.all(), request)
+    group = groups.get_or_404(slug)
+    page_obj = get_page_obj(group.posts.select_related("author", "group"),
+                            request, "group_posts",
+                            count_key="group:%s" % group.pk)
     context = {
         "group": group,
         "page_obj": page_obj,
@@ -35,12 +80,16 @@ def group_posts(request, slug):
 
 
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    posts = user.posts.select_related("group")
-    page_obj = get_page_obj(posts, request)
-    count = posts.count()
+    user = users.get_or_404(username)
+    stats = get_stats(user)
+    count = stats.posts_count
+    posts = user.posts.select_related("author", "group")
+    page_obj = get_page_obj(posts, request, "profile", count)
     following = False
-    if request.user.is_authenticated:
+    suggestions = []
+    if request.user == user:
+        suggestions = suggestions_for(user)
+    elif request.user.is_authenticated:
         following = Follow.objects.filter(user=request.user,
                                           author=user).exists()
 
@@ -48,17 +97,26 @@ def profile(request, username):
         "page_obj": page_obj,
         "author": user,
         "count": count,
+        "stats": stats,
         "following": following,
+        "suggestions": suggestions,
     }
     return render(request, "posts/profile.html", context)
 
 
 def post_detail(request, post_id):
-    posts = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related("author", "group", "author__stats"),
+        id=post_id,
+    )
     form = CommentForm()
-    comments = posts.comments.all()
+    paginator = WindowedPaginator(post.comments.select_related("author"),
+                                  settings.COMMENTS_PAGE_SIZE,
+                                  settings.PAGINATION_WINDOW)
+    comments = paginator.get_page(request.GET.get("comments_page"))
     context = {
-        "post": posts,
+        "post": post,
+        "author_stats": get_stats(post.author),
         'form': form,
         'comments': comments,
     }
@@ -66,6 +124,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@ratelimit("post_create")
 def post_create(request):
     form = PostForm(request.POST or None,
                     files=request.FILES or None, )
@@ -102,6 +161,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit("add_comment")
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -115,9 +175,14 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    page_obj = get_page_obj(Post.objects.select_related("author")
-                            .filter(author__following__user=request.user),
-                            request)
+    user_id = request.user.pk
+    page_obj = get_page_obj(
+        timeline_posts(request.user).select_related("author", "group"),
+        request, "follow_index", count_key="follow:%s" % user_id,
+        count_version=(get_version("posts"),
+                       get_version("timeline:%s" % user_id),
+                       get_version("celebrities")),
+    )
     context = {
         "page_obj": page_obj,
     }
@@ -125,8 +190,9 @@ def follow_index(request):
 
 
 @login_required
+@ratelimit("follow", methods=("GET", "POST"))
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = users.get_or_404(username)
     if request.user == author:
         return redirect('posts:profile', username=username)
     Follow.objects.get_or_create(user=request.user, author=author)
@@ -135,6 +201,36 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = users.get_or_404(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+def get_ids_page_obj(post_ids, request):
+    paginator = WindowedPaginator(post_ids, settings.DEFAULT_PAGE_SIZE,
+                                  settings.PAGINATION_WINDOW)
+    page_obj = paginator.get_page(request.GET.get("page"))
+    posts = (Post.objects.select_related("author", "group")
+             .in_bulk(page_obj.object_list))
+    page_obj.object_list = [posts[pk] for pk in page_obj.object_list
+                            if pk in posts]
+    return page_obj
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page_obj = get_ids_page_obj(search_ids(query) if query else [], request)
+    context = {
+        "query": query,
+        "page_obj": page_obj,
+        "page_query": urlencode({"q": query}) + "&",
+    }
+    return render(request, "posts/search.html", context)
+
+
+def trending(request):
+    context = {
+        "page_obj": get_ids_page_obj(trending_ids(), request),
+        "trending": True,
+    }
+    return render(request, "posts/trending.html", context)
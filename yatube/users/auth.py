@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY, get_user_model, load_backend)
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+from core.caching import make_key
+
+
+def user_key(user_id):
+    return make_key("auth_user", user_id)
+
+
+def invalidate_user(user_id):
+    cache.delete(user_key(user_id))
+
+
+def get_user(request):
+    """То же, что django.contrib.auth.get_user, но пользователь из кэша.
+
+    Ключ — id пользователя, а не сессии: при смене пароля хватает сбросить
+    одну запись, после чего хеш в старых сессиях перестаёт совпадать.
+    """
+    try:
+        user_id = get_user_model()._meta.pk.to_python(
+            request.session[SESSION_KEY]
+        )
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+
+    key = user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = load_backend(backend_path).get_user(user_id)
+        if user is None:
+            return AnonymousUser()
+        cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash())):
+        request.session.flush()
+        return AnonymousUser()
+    return user
@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
+
+AUTH_MIDDLEWARE = (
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "users.middleware.CachedAuthenticationMiddleware",
+)
+
+CONFIGS = (
+    ("db", "django.contrib.sessions.backends.db", AUTH_MIDDLEWARE[0]),
+    ("cached_db", "django.contrib.sessions.backends.cached_db",
+     AUTH_MIDDLEWARE[0]),
+    ("cached_db + кэш пользователя",
+     "django.contrib.sessions.backends.cached_db", AUTH_MIDDLEWARE[1]),
+    ("signed_cookies + кэш пользователя",
+     "django.contrib.sessions.backends.signed_cookies", AUTH_MIDDLEWARE[1]),
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает число запросов к базе и время авторизованного '
+            'запроса с разными хранилищами сессий и кэшем пользователя')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/')
+        parser.add_argument('--iterations', type=int, default=100)
+
+    def middleware(self, auth_middleware):
+        return [auth_middleware if name in AUTH_MIDDLEWARE else name
+                for name in settings.MIDDLEWARE]
+
+    def measure(self, user, engine, auth_middleware, url, iterations):
+        with override_settings(
+            SESSION_ENGINE=engine,
+            MIDDLEWARE=self.middleware(auth_middleware),
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        ):
+            client = Client()
+            client.force_login(user)
+            client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    client.get(url)
+                elapsed = time.perf_counter() - started
+        return len(queries) / iterations, elapsed * 1000 / iterations
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"сессии":<36}{"запросов":>10}{"мс":>9}')
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username='bench-' + get_random_string(8)
+            )
+            results = [
+                (label, *self.measure(user, engine, auth_middleware,
+                                      options['url'], options['iterations']))
+                for label, engine, auth_middleware in CONFIGS
+            ]
+            # Пользователь и сессии нужны только на время замера.
+            transaction.set_rollback(True)
+        for label, queries, ms in results:
+            self.stdout.write(f'{label:<36}{queries:>10.2f}{ms:>9.2f}')
+        baseline, best = results[0][1], min(row[1] for row in results)
+        self.stdout.write(self.style.SUCCESS(
+            f'Экономия: {baseline - best:.2f} запросов на запрос'
+        ))
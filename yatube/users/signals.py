@@ -0,0 +1,16 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth import invalidate_user
+
+User = get_user_model()
+
+
+# Смена и сброс пароля (PasswordChangeView, PasswordResetConfirmView)
+# сохраняют пользователя, так что закэшированная копия со старым
+# хешем пароля сбрасывается здесь же.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
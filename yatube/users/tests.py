@@ -1,6 +1,9 @@
 from http import HTTPStatus
+from io import StringIO
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import Client, TestCase
 
 User = get_user_model()
@@ -82,3 +85,38 @@ class UersURLTests(TestCase):
             with self.subTest(url=url):
                 response = self.authorizied_client.get(url)
                 self.assertTemplateUsed(response, template)
+
+
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="IvanIvanov",
+                                             password="old-pass-123")
+        self.client.force_login(self.user)
+
+    def test_warm_request_skips_session_and_user_queries(self):
+        self.client.get("/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/")
+        self.assertEqual(response.context["user"], self.user)
+
+    def test_password_change_logs_out_other_sessions(self):
+        other = Client()
+        other.force_login(self.user)
+        other.get("/follow/")
+        response = self.client.post("/auth/password_change/", {
+            "old_password": "old-pass-123",
+            "new_password1": "new-pass-456",
+            "new_password2": "new-pass-456",
+        })
+        self.assertRedirects(response, "/auth/password_change/done/")
+        self.assertEqual(self.client.get("/follow/").status_code,
+                         HTTPStatus.OK)
+        self.assertRedirects(other.get("/follow/"),
+                             "/auth/login/?next=/follow/")
+
+    def test_bench_command_reports_savings(self):
+        out = StringIO()
+        call_command("bench_sessions", "--iterations", "2", stdout=out)
+        self.assertRegex(out.getvalue(), r"\ndb +2\.00 ")
+        self.assertIn("Экономия: 2.00", out.getvalue())
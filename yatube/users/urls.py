@@ -10,15 +10,23 @@ from django.contrib.auth.views import (
 )
 from django.urls import path
 
+from core.ratelimit import ratelimit
+
 from . import views
 
 app_name = "users"
 
 urlpatterns = [
-    path("signup/", views.SignUp.as_view(), name="signup"),
+    path(
+        "signup/",
+        ratelimit("signup")(views.SignUp.as_view()),
+        name="signup",
+    ),
     path(
         "login/",
-        LoginView.as_view(template_name="users/login.html"),
+        ratelimit("login")(
+            LoginView.as_view(template_name="users/login.html")
+        ),
         name="login",
     ),
     path(
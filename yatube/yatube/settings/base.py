@@ -0,0 +1,213 @@
+import os
+
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+SECRET_KEY = "yc=&h5fr9mx&^=75(_3&-y(af_t*5m#gov@ffrbk5e2%ul^p0x"
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    "localhost",
+    "127.0.0.1",
+    "[::1]",
+    "testserver",
+]
+
+INSTALLED_APPS = [
+    "posts.apps.PostsConfig",
+    "users.apps.UsersConfig",
+    "core.apps.CoreConfig",
+    "about.apps.AboutConfig",
+    "api.apps.ApiConfig",
+    "django.contrib.admin",
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django.contrib.staticfiles",
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    "core.middleware.PerformanceMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "users.middleware.CachedAuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+ROOT_URLCONF = "yatube.urls"
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, "static"),)
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+TEMPLATES = [
+    {
+        "BACKEND": "core.template_backends.DjangoTemplates",
+        "DIRS": [TEMPLATES_DIR],
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.debug",
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+                "core.context_processors.year.year",
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = "yatube.wsgi.application"
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+    }
+}
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.CommonPasswordValidator",
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.NumericPasswordValidator",
+    },
+]
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+INDEX_CACHE_TIMEOUT = 60 * 5
+# Группы и авторы по slug/username; сбрасываются сигналами при изменении.
+LOOKUP_CACHE_TIMEOUT = 60 * 10
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 2
+CACHE_LOCK_POLL = 0.05
+
+# Ограничение частоты запросов (core.ratelimit): "число/период",
+# период — s, m, h или d; ведро своё у каждого пользователя и адреса.
+RATE_LIMIT_ENABLED = True
+# За прокси адрес клиента берётся из заголовка, например HTTP_X_REAL_IP
+RATE_LIMIT_IP_HEADER = "REMOTE_ADDR"
+RATE_LIMITS = {
+    "post_create": {"user": "10/m", "ip": "30/m"},
+    "add_comment": {"user": "30/m", "ip": "100/m"},
+    "follow": {"user": "60/m", "ip": "200/m"},
+    "login": {"ip": "20/m"},
+    "signup": {"ip": "20/h"},
+}
+
+LANGUAGE_CODE = "ru-ru"
+
+TIME_ZONE = "UTC"
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+STATIC_URL = "/static/"
+
+LOGIN_URL = "users:login"
+LOGIN_REDIRECT_URL = "posts:index"
+EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+
+# Сессия читается из кэша, а из базы — только при промахе.
+# Вариант без базы вообще: "django.contrib.sessions.backends.signed_cookies".
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+# Сколько живёт закэшированный пользователь (users.auth)
+AUTH_USER_CACHE_TIMEOUT = 60 * 10
+
+DEFAULT_PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+
+# Сколько соседних с текущей страниц показывать в навигации
+PAGINATION_WINDOW = 2
+COUNT_CACHE_TIMEOUT = 60 * 5
+# Выше этого порога число строк берётся из оценки планировщика PostgreSQL
+COUNT_ESTIMATE_MIN = 100_000
+
+# Рекомендации подписок (manage.py compute_suggestions): сколько хранить
+# на пользователя и веса «друзей друзей» и общих подписчиков
+SUGGESTIONS_LIMIT = 5
+SUGGESTIONS_WEIGHTS = {"friends": 1.0, "cofollow": 0.5}
+
+# Популярное: оценка поста — комментарии, затухающие вдвое за
+# TRENDING_HALF_LIFE секунд; страница строится из TRENDING_SIZE лучших
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_SIZE = 50
+TRENDING_MIN_SCORE = 0.05
+# Сколько строк оставляет manage.py compact_trending
+TRENDING_MAX_ROWS = 1000
+TRENDING_REBUILD_HALF_LIVES = 8
+TRENDING_CACHE_TIMEOUT = 60
+
+# "offset" — номера страниц (?page=), "keyset" — курсоры (?after=/?before=)
+PAGINATION_MODES = {
+    "index": "offset",
+    "group_posts": "offset",
+    "profile": "offset",
+    "follow_index": "offset",
+}
+
+# Посты авторов, у которых подписчиков больше лимита, не раздаются
+# по лентам при публикации, а подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_SIZE = 1000
+
+# "auto" — FTS5 на SQLite, если доступен, иначе собственный индекс токенов
+SEARCH_BACKEND = "auto"
+SEARCH_MAX_RESULTS = 1000
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Загруженные картинки уменьшаются до IMAGE_MAX_SIDE, очищаются от
+# метаданных и перекодируются; WebP, если Pillow его поддерживает,
+# иначе прогрессивный JPEG.
+IMAGE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_MAX_SIDE = 1920
+IMAGE_FORMAT = "WEBP"
+IMAGE_QUALITY = 82
+
+THUMBNAIL_BACKEND = 'core.thumbnail.ThumbnailBackend'
+# Миниатюры создаются в фоне после сохранения поста; 0 — синхронно
+# (так в тестах: override_settings у классов с картинками и фикстура
+# sync_thumbnails в tests/conftest.py).
+THUMBNAIL_WORKERS = 2
+# Пресеты миниатюр: ширины для srcset, отношение высоты к ширине и
+# форматы; последний формат — запасной для <img>.
+THUMBNAIL_PRESETS = {
+    "post": {
+        "widths": (480, 960, 1440),
+        "ratio": 339 / 960,
+        "options": {"crop": "center", "upscale": True},
+        "formats": ("WEBP", "JPEG"),
+        "sizes": "(min-width: 992px) 960px, 100vw",
+    },
+}
+# Пресеты, варианты которых создаются сразу после сохранения поста.
+POST_IMAGE_PRESETS = ("post",)
+
+# Server-Timing и гистограммы на /admin/metrics/; если выключено,
+# middleware исключается из цепочки и ничего не стоит.
+PERFORMANCE_METRICS_ENABLED = True
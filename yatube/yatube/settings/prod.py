@@ -0,0 +1,95 @@
+import os
+from copy import deepcopy
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import ALLOWED_HOSTS, BASE_DIR, DATABASES, TEMPLATES
+
+DEBUG = False
+
+# Ключ из base.py лежит в репозитории и в проде не годится.
+SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
+if not SECRET_KEY:
+    raise ImproperlyConfigured("Не задана переменная DJANGO_SECRET_KEY")
+if os.getenv("DJANGO_ALLOWED_HOSTS"):
+    ALLOWED_HOSTS = os.environ["DJANGO_ALLOWED_HOSTS"].split(",")
+
+# Соединение с базой переиспользуется между запросами, а не открывается
+# заново на каждый.
+conn_max_age = int(os.getenv("DJANGO_CONN_MAX_AGE", 60))
+
+if os.getenv("POSTGRES_DB"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ["POSTGRES_DB"],
+            "USER": os.getenv("POSTGRES_USER", ""),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("POSTGRES_HOST", ""),
+            "PORT": os.getenv("POSTGRES_PORT", ""),
+            "CONN_MAX_AGE": conn_max_age,
+        }
+    }
+else:
+    DATABASES = deepcopy(DATABASES)
+    DATABASES["default"]["CONN_MAX_AGE"] = conn_max_age
+    # Ждать освобождения блокировки записи вместо «database is locked».
+    DATABASES["default"]["OPTIONS"] = {"timeout": 20}
+
+# Общий для всех воркеров кэш (L2) за кэшем процесса (L1): сброс версии
+# ленты в одном воркере виден остальным не позже чем через L1_TIMEOUT.
+# Redis требует пакет django-redis, Memcached — python-memcached.
+if os.getenv("REDIS_URL"):
+    shared_cache = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.environ["REDIS_URL"],
+    }
+elif os.getenv("MEMCACHED_LOCATION"):
+    shared_cache = {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": os.environ["MEMCACHED_LOCATION"].split(","),
+    }
+else:
+    shared_cache = {
+        "BACKEND": "core.cache_backends.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    }
+CACHES = {
+    "default": {
+        "BACKEND": "core.cache_backends.TwoTierCache",
+        "OPTIONS": {"L1": "local", "L2": "shared", "L1_TIMEOUT": 2},
+    },
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "shared": shared_cache,
+}
+
+# Сессии в подписанных cookie не нужны ни база, ни общий кэш, но отозвать
+# такую сессию на сервере до истечения срока нельзя.
+if os.getenv("SESSION_SIGNED_COOKIES"):
+    SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+
+# Выполняются на каждом новом соединении SQLite (core.db). В режиме WAL
+# чтение не блокируется записью.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,
+    "temp_store": "MEMORY",
+    "mmap_size": 128 * 1024 * 1024,
+}
+
+# Шаблоны читаются с диска и разбираются один раз на процесс.
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    ("django.template.loaders.cached.Loader", [
+        "django.template.loaders.filesystem.Loader",
+        "django.template.loaders.app_directories.Loader",
+    ]),
+]
+PRECOMPILE_TEMPLATES = True
@@ -3,9 +3,13 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import performance_metrics
+
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
+    path("admin/metrics/", performance_metrics, name="metrics"),
     path("admin/", admin.site.urls),
+    path("api/", include("api.urls", namespace="api")),
     path("about/", include("about.urls", namespace="about")),
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),